@@ -0,0 +1,424 @@
+# ==============================
+# analyzer.py｜シグナル統合・注目度・コメント生成（完全版）
+# ==============================
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from indicators import add_indicators, has_indicators
+from database import load_all_price_history
+
+# analyze_stock が参照する指標列（add_indicators 済みなら再計算しない）
+ANALYZER_COLS = ["RSI", "MACD", "MACD_signal", "ADX", "MA25", "MA75"]
+
+def ensure_indicators(df):
+    """
+    指標列が揃っていればそのまま返し、足りなければコピーに一括計算して返す。
+    """
+    if has_indicators(df, ANALYZER_COLS):
+        return df
+    return add_indicators(df.copy())
+
+# ==========================
+# シグナル系列（全期間を1回で判定：各日の値＝その日までのデータで判定した結果）
+# ==========================
+
+def _prev_window_min(s, window=59):
+    # iloc[-60:-1]（当日を除く直近59本）の最小値を各日について計算
+    return s.shift(1).rolling(window, min_periods=1).min()
+
+def _prev_window_max(s, window=59):
+    return s.shift(1).rolling(window, min_periods=1).max()
+
+def _cross_up(a, b):
+    return (a.shift(1) < b.shift(1)) & (a > b)
+
+def _cross_down(a, b):
+    return (a.shift(1) > b.shift(1)) & (a < b)
+
+def macd_golden_series(df):
+    return _cross_up(df["MACD"], df["MACD_signal"])
+
+def macd_dead_series(df):
+    return _cross_down(df["MACD"], df["MACD_signal"])
+
+def rsi_rebound_series(df):
+    return (df["RSI"].shift(1) < 30) & (df["RSI"] > 30)
+
+def rsi_overheat_series(df):
+    return (df["RSI"].shift(1) < 70) & (df["RSI"] > 70)
+
+def below_ma25_series(df):
+    return df["Close"] < df["MA25"]
+
+def recent_high_break_series(df):
+    return df["High"] > _prev_window_max(df["High"])
+
+def period_high_series(df):
+    return df["High"] >= df["High"].cummax()
+
+def spike_history_series(df, threshold=0.4):
+    change = (df["Close"] - df["Close"].shift(1)) / df["Close"].shift(1)
+    return (change.abs() > threshold).cumsum() >= 1
+
+# ---------- 買いシグナル ----------
+
+def candlestick_series(df):
+    return (df["Close"] > df["Open"]) & (df["Low"] < df["Low"].rolling(3).min())
+
+def weekly_high_break_series(df):
+    return df["Close"] > df["High"].rolling(5).max()
+
+def mid_term_golden_cross_series(df):
+    return _cross_up(df["MA25"], df["MA75"])
+
+def pullback_bounce_series(df):
+    above = df["Close"] > df["MA25"]
+    return above.shift(1, fill_value=False) & above
+
+def trendline_bounce_series(df):
+    up = df["Low"].diff() > 0
+    return up & up.shift(1, fill_value=False) & up.shift(2, fill_value=False)
+
+def higher_lows_series(df):
+    lows = df["Low"].rolling(3).min()
+    return (lows.shift(2) < lows.shift(1)) & (lows.shift(1) < lows)
+
+# ---------- 売りシグナル（買いシグナルの反対） ----------
+
+def rsi_fall_series(df):
+    rsi = df["RSI"]
+    return (rsi.shift(1) > 70) & (rsi < rsi.shift(1))
+
+def mid_term_dead_cross_series(df):
+    return _cross_down(df["MA25"], df["MA75"])
+
+def recent_low_break_series(df):
+    return df["Low"] < _prev_window_min(df["Low"])
+
+def return_sell_series(df):
+    below = df["Close"] < df["MA25"]
+    return below.shift(1, fill_value=False) & below
+
+def trendline_break_series(df):
+    down = df["Low"].diff() < 0
+    return down & down.shift(1, fill_value=False) & down.shift(2, fill_value=False)
+
+def lower_highs_series(df):
+    highs = df["High"].rolling(3).max()
+    return (highs.shift(2) > highs.shift(1)) & (highs.shift(1) > highs)
+
+def three_black_crows_series(df):
+    bearish = df["Close"] < df["Open"]
+    return bearish & bearish.shift(1, fill_value=False) & bearish.shift(2, fill_value=False)
+
+def weekly_low_break_series(df):
+    return df["Low"] < df["Low"].rolling(5).min()
+
+# ==========================
+# シグナルルール定義（ルールを追加するときはここに1行足すだけ）
+#   id：内部で使うルールID / label：ログ・通知に出す表示名
+#   side：buy / sell / neutral / weight：スコアへの加減点（売りは負）
+# ==========================
+
+def _rule(rule_id, label, side, weight, series):
+    return {"id": rule_id, "label": label, "side": side, "weight": weight, "series": series}
+
+# ✅ analyze_stock のシグナル順
+SIGNAL_RULES = [
+    _rule("macd_golden",        "MACD陽転",                 "buy",     1,  macd_golden_series),
+    _rule("macd_dead",          "MACD陰転",                 "sell",    -3, macd_dead_series),
+    _rule("rsi_rebound",        "RSI反発",                  "buy",     2,  rsi_rebound_series),
+    _rule("rsi_overheat",       "RSI過熱",                  "sell",    -2, rsi_overheat_series),
+    _rule("below_ma25",         "移動平均線下抜け",          "sell",    -1, below_ma25_series),
+    _rule("recent_high_break",  "直近高値突破",              "buy",     3,  recent_high_break_series),
+    _rule("period_high",        "期間内高値更新（要注目）",   "neutral", 0,  period_high_series),
+    _rule("hammer",             "下ヒゲ陽線（反発兆候）",     "buy",     2,  candlestick_series),
+    _rule("spike_history",      "過去に急騰／急落歴あり",     "sell",    -1, spike_history_series),
+    _rule("weekly_high_break",  "週足高値ブレイク",          "neutral", 0,  weekly_high_break_series),
+    _rule("mid_golden_cross",   "中期ゴールデンクロス",       "buy",     3,  mid_term_golden_cross_series),
+    _rule("pullback_bounce",    "押し目陽線",                "buy",     2,  pullback_bounce_series),
+    _rule("trendline_bounce",   "上昇トレンドライン反発",     "buy",     2,  trendline_bounce_series),
+    _rule("higher_lows",        "下値切り上げ継続",          "buy",     2,  higher_lows_series),
+    _rule("rsi_fall",           "RSI反落（過熱から下降）",    "sell",    -2, rsi_fall_series),
+    _rule("mid_dead_cross",     "中期デッドクロス",          "sell",    -3, mid_term_dead_cross_series),
+    _rule("recent_low_break",   "直近安値割れ",              "sell",    -1, recent_low_break_series),
+    _rule("return_sell",        "戻り売り陰線",              "sell",    -2, return_sell_series),
+    _rule("trendline_break",    "下降トレンドライン割れ",     "sell",    -1, trendline_break_series),
+    _rule("lower_highs",        "高値切り下げ継続",          "sell",    -2, lower_highs_series),
+    _rule("three_black_crows",  "三連続陰線（弱気連続）",     "sell",    -3, three_black_crows_series),
+    _rule("weekly_low_break",   "週足安値ブレイク",          "sell",    -1, weekly_low_break_series),
+]
+
+RULES_BY_ID = {r["id"]: r for r in SIGNAL_RULES}
+RULES_BY_LABEL = {r["label"]: r for r in SIGNAL_RULES}
+
+def _lookup_rule(signal):
+    return RULES_BY_ID.get(signal) or RULES_BY_LABEL.get(signal)
+
+def signal_labels(signals):
+    """
+    ルールID（またはラベル）のリストを表示用ラベルのリストに変換する。
+    """
+    return [(_lookup_rule(s) or {"label": s})["label"] for s in signals]
+
+MIN_BARS = 30  # analyze_stock が判定を行う最小本数
+
+def build_signal_frame(df):
+    """
+    全シグナルを日付 × ルールID の bool 表として1回で計算する（過去日のシグナル履歴用）。
+    各行はその日までのデータだけで analyze_stock を実行した場合と同じ判定になる。
+    """
+    df = ensure_indicators(df)
+    frame = pd.DataFrame(
+        {r["id"]: r["series"](df).fillna(False).astype(bool) for r in SIGNAL_RULES},
+        index=df.index,
+    )
+    frame.iloc[:MIN_BARS - 1] = False
+    return frame
+
+def _last(rule_id, series):
+    return [RULES_BY_ID[rule_id]["label"]] if bool(series.iloc[-1]) else []
+
+# ==========================
+# 最終日の判定（従来のインターフェース）
+# ==========================
+
+def detect_candlestick_patterns(df):
+    return _last("hammer", candlestick_series(df))
+
+def detect_weekly_signals(df):
+    return _last("weekly_high_break", weekly_high_break_series(df))
+
+def detect_mid_term_golden_cross(df):
+    return _last("mid_golden_cross", mid_term_golden_cross_series(df))
+
+def detect_pullback_bounce(df):
+    return _last("pullback_bounce", pullback_bounce_series(df))
+
+def detect_trendline_bounce(df):
+    return _last("trendline_bounce", trendline_bounce_series(df))
+
+def detect_higher_lows(df):
+    return _last("higher_lows", higher_lows_series(df))
+
+def detect_rsi_fall(df):
+    return _last("rsi_fall", rsi_fall_series(df))
+
+def detect_mid_term_dead_cross(df):
+    return _last("mid_dead_cross", mid_term_dead_cross_series(df))
+
+def detect_recent_low_break(df):
+    return _last("recent_low_break", recent_low_break_series(df))
+
+def detect_return_sell_signal(df):
+    return _last("return_sell", return_sell_series(df))
+
+def detect_trendline_break(df):
+    return _last("trendline_break", trendline_break_series(df))
+
+def detect_lower_highs(df):
+    return _last("lower_highs", lower_highs_series(df))
+
+def detect_three_black_crows(df):
+    return _last("three_black_crows", three_black_crows_series(df))
+
+def detect_weekly_low_break(df):
+    return _last("weekly_low_break", weekly_low_break_series(df))
+
+# ==========================
+
+def _weight_by_keyword(side, sig):
+    # ルール未登録のシグナル（自由記述）用：従来のキーワード判定
+    if side == "buy":
+        if "ゴールデン" in sig or "直近高値" in sig:
+            return 3
+        elif "反発" in sig or "押し目" in sig or "切り上げ" in sig:
+            return 2
+        return 1
+    if "陰転" in sig or "三連続陰線" in sig or "デッドクロス" in sig:
+        return -3
+    elif "過熱" in sig or "戻り売り" in sig or "切り下げ" in sig:
+        return -2
+    return -1
+
+def evaluate_signal_strength(signals_dict: dict) -> int:
+    score = 0
+    for side in ("buy", "sell"):
+        for sig in signals_dict.get(side, []):
+            rule = _lookup_rule(sig)
+            score += rule["weight"] if rule else _weight_by_keyword(side, sig)
+    return score  # -10 〜 +10 のスコアを想定
+
+def analyze_signals(signals: list[str], adx_last: float) -> tuple:
+    signal_dict = classify_signals(signals)
+    score = evaluate_signal_strength(signal_dict)
+
+    # 内部スコアに基づく attention 判定
+    if score >= 4:
+        attention = "強い買い"
+        comment = "★ 買いタイミングが揃っています。チャンスに注目。"
+    elif score <= -3:
+        attention = "強い売り"
+        comment = "⚠️ 売り圧力が高まっています。利確・調整に注意。"
+    elif score >= 2:
+        attention = "打診買い"
+        comment = "🔍 やや買い寄り。慎重に押し目を狙いたい場面。"
+    elif score <= -2:
+        attention = "打診売り"
+        comment = "🔻 やや下落傾向。戻り売りに注意。"
+    else:
+        attention = "判断保留"
+        comment = "📊 シグナルが拮抗しており方向感に欠けます。様子見も視野に。"
+
+    return attention, comment, score, str(score)
+
+def analyze_stock(df, info=None):
+    if len(df) < MIN_BARS:
+        return [], "ー", "", "中立（様子見）", 0, ""
+
+    # テクニカル指標（add_indicators で計算済みの列を使う）
+    df = ensure_indicators(df)
+
+    # ✅ 全シグナルの系列から最終日の行だけを読む（戻り値はルールID）
+    last = build_signal_frame(df).iloc[-1]
+    signals = [r["id"] for r in SIGNAL_RULES if last[r["id"]]]
+    if info:
+        signals += detect_risky_fundamentals(info)
+
+    adx_last = df["ADX"].iloc[-1]
+    attention, comment, score, score_str = analyze_signals(signals, adx_last)
+    return signals, comment, "", attention, score, score_str
+
+def _classify_by_keyword(s):
+    # ルール未登録のシグナル（自由記述）用：従来のキーワード判定
+    buy_keywords = ["陽転", "反発", "ゴールデン", "突破", "押し目", "切り上げ", "雲上抜け"]
+    sell_keywords = [
+        "陰転", "過熱", "下抜け", "赤字", "危険", "急騰", "利確", "調整", "雲下抜け",
+        "デッドクロス", "安値割れ", "戻り売り", "下降トレンドライン", "切り下げ", "三連続陰線", "週足安値"
+    ]
+    if any(kw in s for kw in buy_keywords):
+        return "buy"
+    elif any(kw in s for kw in sell_keywords):
+        return "sell"
+    return "neutral"
+
+def classify_signals(signals: list[str]) -> dict:
+    """
+    ルールID（またはラベル）を buy / sell / neutral に分け、表示用ラベルで返す。
+    """
+    result = {"buy": [], "sell": [], "neutral": []}
+    for s in signals:
+        rule = _lookup_rule(s)
+        if rule:
+            result[rule["side"]].append(rule["label"])
+        else:
+            result[_classify_by_keyword(s)].append(s)
+    return result
+
+def detect_spike_history(df, threshold=0.4):
+    if spike_history_series(df, threshold).iloc[-1]:
+        return "過去に急騰／急落歴あり" #⚠️
+    return None
+
+# ==========================
+# 全銘柄スキャン（DB の price_history をそのまま使う：通信なし）
+# ==========================
+
+# price_history（小文字列名）→ analyze_stock の列名
+PRICE_COLUMN_MAP = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"}
+
+def _split_by_symbol(df_all):
+    """
+    1回だけ (symbol, date) で並べ替え、銘柄ごとの開始・終了位置（オフセット配列）で切り出す。
+    戻り値：[(symbol, name, OHLCV DataFrame), ...]
+    """
+    df = df_all.rename(columns=PRICE_COLUMN_MAP)
+    df = df[["symbol", "name", "date"] + list(PRICE_COLUMN_MAP.values())]
+    df = df.sort_values(["symbol", "date"], kind="stable").drop_duplicates(["symbol", "date"], keep="last")
+    dates = pd.DatetimeIndex(pd.to_datetime(df["date"]), name="Date")
+    symbols = df["symbol"].to_numpy()
+
+    starts = np.flatnonzero(np.r_[True, symbols[1:] != symbols[:-1]]) if len(symbols) else np.array([], dtype=int)
+    ends = np.r_[starts[1:], len(symbols)].astype(int)
+    ohlcv = df[list(PRICE_COLUMN_MAP.values())].to_numpy(dtype=np.float64)
+    names = df["name"].to_numpy()
+
+    slices = []
+    for start, end in zip(starts, ends):
+        frame = pd.DataFrame(ohlcv[start:end], index=dates[start:end], columns=list(PRICE_COLUMN_MAP.values()))
+        slices.append((symbols[start], names[end - 1], frame))
+    return slices
+
+def _analyze_slices(slices):
+    results = []
+    for symbol, name, frame in slices:
+        if len(frame) < MIN_BARS:
+            continue
+        try:
+            signals, comment, _, attention, score, _ = analyze_stock(frame)
+        except Exception as e:
+            print(f"❌ 分析失敗: {symbol} - {e}")
+            continue
+        results.append({
+            "symbol": symbol,
+            "name": name,
+            "date": frame.index[-1].strftime("%Y-%m-%d"),
+            "signals": signals,
+            "attention": attention,
+            "score": score,
+            "comment": comment,
+        })
+    return results
+
+def scan_universe(df_all, max_workers=None, chunk_size=200):
+    """
+    price_history 形式（symbol, name, date, open, high, low, close, volume …）の全銘柄データを
+    銘柄ごとに分析する。max_workers を指定するとプロセス並列で実行する。
+    """
+    slices = _split_by_symbol(df_all)
+    if not max_workers or max_workers <= 1:
+        return _analyze_slices(slices)
+
+    chunks = [slices[i:i + chunk_size] for i in range(0, len(slices), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_result in executor.map(_analyze_slices, chunks):
+            results += chunk_result
+    return results
+
+def detect_signals(df_all, max_workers=None):
+    buy_signals = []
+    sell_signals = []
+
+    # 🧠 統合分析ロジックを使用（銘柄ごとの切り出しは1回の並べ替えで済ませる）
+    for r in scan_universe(df_all, max_workers=max_workers):
+        symbol, name, attention = r["symbol"], r["name"], r["attention"]
+
+        # 🎯 通知条件：attention の文字列を使う
+        if "買" in attention:
+            buy_signals.append(f"{symbol}（{name}）: {attention} | {', '.join(signal_labels(r['signals']))}")
+        elif "売" in attention:
+            sell_signals.append(f"{symbol}（{name}）: {attention} | {', '.join(signal_labels(r['signals']))}")
+
+    return buy_signals, sell_signals
+
+def rescan_from_db(max_workers=None):
+    """
+    DB に保存済みの全銘柄の足だけでシグナルを再判定する（ネットワーク不要）。
+    """
+    return detect_signals(load_all_price_history(), max_workers=max_workers)
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="DB保存済みデータで全銘柄のシグナルを再判定")
+    parser.add_argument("--workers", type=int, default=None, help="並列プロセス数（省略時は直列）")
+    args = parser.parse_args()
+
+    buy, sell = rescan_from_db(max_workers=args.workers)
+    print(f"📈 買い: {len(buy)}件")
+    for line in buy:
+        print(f"  {line}")
+    print(f"📉 売り: {len(sell)}件")
+    for line in sell:
+        print(f"  {line}")
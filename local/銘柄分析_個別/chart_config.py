@@ -0,0 +1,725 @@
+# ==============================
+# Sec｜chart_config.py
+# ==============================
+
+import matplotlib.pyplot as plt
+import matplotlib.ticker as mticker  # ファイル冒頭で未インポートならここでもOK
+import mplfinance as mpf
+import hashlib
+import numpy as np
+import os
+import pandas as pd
+from datetime import datetime
+from indicators import add_indicators as compute_indicators_into
+from image_artifact import ImageArtifact
+import matplotlib.dates as mdates
+import matplotlib.transforms as mtransforms
+from matplotlib import rcParams
+from matplotlib.ticker import ScalarFormatter, FuncFormatter
+
+#print("📄 このファイルは実行されています:", __file__)
+
+def add_indicators(df):
+    # ✅ MA/RSI/MACD/BB/ADX/Stoch/一目/ATR を indicators.py で一括計算（列名は従来どおり）
+    return compute_indicators_into(df)
+
+def judge_dynamic_zones(latest):
+    """
+    RSIとADXに基づいて、押し目ゾーン（low〜high）と利確ゾーン（profit_target）を自動で決定する関数。
+    """
+    rsi = latest["RSI"]
+    adx = latest["ADX"]
+    ma25 = latest["MA25"]
+    ma75 = latest["MA75"]
+    close = latest["Close"]
+
+    # ✅ 最初にデフォルト値を明示しておく（これが重要！）
+    oshime_low = ma75 * 0.95
+    oshime_high = ma75
+    profit_target = close * 1.03
+
+    if adx > 25:
+        if rsi < 50:
+            # トレンド強く、まだ買われ過ぎでない → 押し目チャンス
+            oshime_low = ma25 * 0.97
+            oshime_high = ma25
+        elif rsi > 70:
+            # トレンド強いが過熱 → 利確重視
+            profit_target = close * 0.98  # 手前で利確
+    elif adx < 15:
+        # トレンドが弱い → レンジ。深い押し目狙い
+        oshime_low = ma75 * 0.93
+        oshime_high = ma75 * 0.98
+
+    return oshime_low, oshime_high, profit_target
+
+def generate_zone_comment(close, profit_target, oshime_low, oshime_high, rsi, adx, trend):
+    # 状況別コメントロジック
+    if close >= profit_target:
+        if rsi > 70:
+            comment = (
+                f"The current price is within the profit-taking zone, and the RSI is {rsi:.1f}, "
+                f"indicating an overbought condition. Full profit-taking should be considered."
+            )
+            color = "#cc0000"  # 濃い赤（全利確）
+        else:
+            comment = (
+                f"The price has reached the profit-taking zone (from {profit_target:.1f} JPY), "
+                f"but the RSI is {rsi:.1f}, suggesting moderate momentum. Partial profit-taking may be appropriate."
+            )
+            color = "#f4c2c2"  # 淡い赤（部分利確）
+
+    elif oshime_low <= close <= oshime_high:
+        if rsi < 50 and adx > 25:
+            comment = (
+                f"The price is approaching the pullback zone ({oshime_low:.1f}–{oshime_high:.1f} JPY). "
+                f"RSI: {rsi:.1f}, ADX: {adx:.1f}. This indicates a strong uptrend undergoing a temporary correction. "
+                f"A rebound is worth monitoring."
+            )
+            color = "#006400"  # 濃い緑（全力買い）
+        else:
+            comment = (
+                f"The price is within the pullback zone, but RSI is {rsi:.1f} and ADX is {adx:.1f}, "
+                f"suggesting a weaker trend. Entry should be made with caution."
+            )
+            color = "#b2d8b2"  # 淡い緑（打診買い）
+
+    else:
+        comment = (
+            f"The price is currently outside the defined zones. "
+            f"Consider taking a cautious approach to both entries and exits."
+        )
+        color = "#d3d3d3"  # グレー（中立ゾーン）
+
+    return comment, color
+
+#2025-06-22add
+def analyze_signals(df_recent):
+    latest = df_recent.iloc[-1]
+    signals = {
+        "buy": [],
+        "sell": [],
+        "neutral": []
+    }
+
+    # 🟢 ゴールデンクロス（MA5 > MA25）
+    if latest["MA5"] > latest["MA25"] and df_recent["MA5"].iloc[-2] <= df_recent["MA25"].iloc[-2]:
+        signals["buy"].append("MAゴールデンクロス（短期 > 中期）")
+
+    # 🟢 RSI反発（30以下 → 上昇）
+    if df_recent["RSI"].iloc[-2] < 30 and latest["RSI"] >= 30:
+        signals["buy"].append(f"RSI反発（{df_recent['RSI'].iloc[-2]:.1f} → {latest['RSI']:.1f}）")
+
+    # 🟢 MACD陽転
+    if df_recent["MACD"].iloc[-2] < df_recent["MACD_signal"].iloc[-2] and latest["MACD"] > latest["MACD_signal"]:
+        signals["buy"].append("MACD陽転（シグナル上抜け）")
+
+    # 🟢 出来高急増（前日比1.5倍以上）
+    vol_ratio = latest["Volume"] / df_recent["Volume"].iloc[-2]
+    if vol_ratio >= 1.5:
+        signals["buy"].append(f"出来高急増（{vol_ratio:.1f}倍）")
+
+    # 🔴 RSI過熱 + 利確圏
+    if latest["RSI"] >= 70:
+        signals["sell"].append(f"RSI過熱（{latest['RSI']:.1f}）")
+    if latest["Close"] > latest["MA25"] * 1.05:
+        signals["sell"].append("株価が中期線を大きく乖離（利確圏）")
+
+    # ⚪ 中立：レンジ or 雲ねじれ
+    if latest["ADX"] < 15:
+        signals["neutral"].append(f"ADXが低下中（{latest['ADX']:.1f}）→トレンド弱")
+
+    senkou1 = df_recent["senkou1"].iloc[-1]
+    senkou2 = df_recent["senkou2"].iloc[-1]
+    if abs(senkou1 - senkou2) < 0.5:
+        signals["neutral"].append("一目均衡表の雲がねじれ状態")
+
+    # ✅ 押し目ゾーン判定（MACD状況にかかわらず）
+    oshime_low, oshime_high, _ = judge_dynamic_zones(latest)
+    in_pullback_zone = oshime_low <= latest["Close"] <= oshime_high
+    strong_trend = latest["ADX"] > 25
+    rsi_moderate = latest["RSI"] < 55
+
+    if in_pullback_zone and strong_trend and rsi_moderate:
+        signals["buy"].append("押し目ゾーンに到達（MACD下落中だが強トレンド・RSI低下）")
+
+    return signals
+
+def generate_signal_comment(signals):
+    buy_signals = signals.get("buy", [])
+    sell_signals = signals.get("sell", [])
+    neutral_signals = signals.get("neutral", [])
+
+    parts = []
+
+    # 詳細列挙
+    if buy_signals:
+        parts.append(f"📈 買いシグナル: " + "、".join(buy_signals))
+    if sell_signals:
+        parts.append(f"📉 売りシグナル: " + "、".join(sell_signals))
+    if neutral_signals and not (buy_signals or sell_signals):
+        parts.append(f"⚪ 中立シグナル: " + "、".join(neutral_signals))
+
+    # 総評の生成
+    summary = ""
+    if buy_signals and not sell_signals:
+        summary = "✅ 現状は買い優勢の状況です。押し目やエントリーポイントを検討する局面と考えられます。"
+    elif sell_signals and not buy_signals:
+        summary = "⚠ 売りシグナルが優勢です。利確や調整の可能性に注意が必要な局面です。"
+    elif buy_signals and sell_signals:
+        summary = "🔄 買いと売りのシグナルが混在しています。方向感に乏しく、様子見が無難です。"
+    elif neutral_signals:
+        summary = "🔍 特筆すべき売買シグナルは見られず、様子見の局面です。"
+    else:
+        summary = "📭 テクニカルシグナルは確認されませんでした。データ不足か静かな相場の可能性があります。"
+
+    return summary + "\n" + " / ".join(parts) if parts else summary
+
+# ==========================
+# 描画キャッシュ用のキー
+# ==========================
+
+# ✅ 描画内容（線・色・レイアウト等）を変えたら上げる → 過去の画像は使い回さない
+CHART_STYLE_VERSION = "3"
+CHART_RECENT_DAYS = 60
+# plot_chart が参照する列（ここにない列は画像に影響しない）
+CHART_COLUMNS = [
+    "Open", "High", "Low", "Close", "Volume",
+    "MA5", "MA25", "MA75", "RSI", "ADX",
+    "MACD", "MACD_signal", "MACD_diff", "senkou1", "senkou2",
+]
+
+def chart_content_key(df, symbol, name):
+    """
+    直近60本・描画に使う列・スタイル版数から描画内容のキーを作る（描画前に判定できる）。
+    同じキーなら同じ画像になる。
+    """
+    df_recent = df.tail(CHART_RECENT_DAYS)
+    values = np.ascontiguousarray(df_recent.reindex(columns=CHART_COLUMNS).to_numpy(dtype=np.float64))
+    dates = pd.DatetimeIndex(df_recent.index).strftime("%Y-%m-%d")
+    h = hashlib.md5()
+    h.update(f"{CHART_STYLE_VERSION}|{symbol}|{name}|{','.join(CHART_COLUMNS)}|".encode())
+    h.update(",".join(dates).encode())
+    h.update(values.tobytes())
+    return h.hexdigest()
+
+# ==========================
+# 図のひな形（1プロセスで1回だけ組み立て、銘柄ごとにデータだけ差し替える）
+# ==========================
+
+CHART_FONT_FAMILY = ['MS Gothic', 'Meiryo', 'Arial Unicode MS']  # ✅ Windows向けフォント
+
+# mplfinance 'yahoo' スタイルに基づく出来高ラベルの色
+VOLUME_LABEL_UP = '#26a69a'   # 緑
+VOLUME_LABEL_DOWN = '#ef5350' # 赤
+
+def english_volume_formatter(x, pos):
+    if x >= 1_000_000_000:
+        return f"{x/1_000_000_000:.1f}B"
+    elif x >= 1_000_000:
+        return f"{x/1_000_000:.1f}M"
+    elif x >= 1_000:
+        return f"{x/1_000:.0f}K"
+    elif x == 0:
+        return ""
+    else:
+        return str(int(x))
+
+# フォーマットは既存のformatterと同じく「英語表記（小数点なし）」
+def format_volume_label(x):
+    if x >= 1_000_000_000:
+        return f"{int(x / 1_000_000_000)}B"
+    elif x >= 1_000_000:
+        return f"{int(x / 1_000_000)}M"
+    elif x >= 1_000:
+        return f"{int(x / 1_000)}K"
+    else:
+        return str(int(x))
+
+def _chart_series(df_recent, support_20, resist_20, support_60, resist_60):
+    """
+    ひな形の線・棒に流し込む系列（addplot と同じ並び）。
+    """
+    n = len(df_recent)
+    macd = df_recent["MACD"]
+    signal = df_recent["MACD_signal"]
+    return {
+        "main": [
+            df_recent["MA5"], df_recent["MA25"], df_recent["MA75"],
+            [support_20] * n, [resist_20] * n, [support_60] * n, [resist_60] * n,
+        ],
+        "rsi": df_recent["RSI"],
+        "macd_bar": df_recent["MACD_diff"],
+        "macd": [
+            macd.where(macd.diff() >= 0), macd.where(macd.diff() < 0),
+            signal.where(signal.diff() >= 0), signal.where(signal.diff() < 0),
+        ],
+    }
+
+def _addplots(series):
+    # secondary_y=False：銘柄ごとに副軸へ振り分けられてパネル構成が変わらないよう固定
+    ap = lambda data, **kw: mpf.make_addplot(data, secondary_y=False, **kw)
+    main = series["main"]
+    macd = series["macd"]
+    return [
+        # 🌈 移動平均線 & サポート/レジスタンス
+        ap(main[0], color="#1f77b4", width=0.7),
+        ap(main[1], color="#ff7f0e", width=0.8),
+        ap(main[2], color="#9467bd", width=0.7),
+        ap(main[3], color="green", linestyle="dotted"),
+        ap(main[4], color="red", linestyle="dotted"),
+        ap(main[5], color="green", linestyle="dashdot"),
+        ap(main[6], color="red", linestyle="dashdot"),
+
+        # ⚫ RSI（パネル2）→ 黒
+        ap(series["rsi"], panel=2, color='black'),
+
+        # 🔵 MACDヒストグラム & 線（パネル3）
+        ap(series["macd_bar"], panel=3, type='bar', color='plum', alpha=0.5, width=0.7),
+        ap(macd[0], panel=3, color='#8cc4e8', width=1.3),   # MACD↑：淡青
+        ap(macd[1], panel=3, color='#f6a6a6', width=1.3),   # MACD↓：淡赤
+        ap(macd[2], panel=3, color='#f4c187', width=1.2),   # Signal↑：淡橙
+        ap(macd[3], panel=3, color='#d6b3f6', width=1.2),   # Signal↓：淡紫
+    ]
+
+class ChartTemplate:
+    """
+    mplfinance で 7 パネルの図・書式・凡例・固定テキストを1回だけ作り、
+    銘柄ごとにローソク足・線・棒・注釈のデータを差し替えて保存する。
+    本数（通常60本）ごとに1つ作る。
+    """
+    def __init__(self, n):
+        rcParams['font.family'] = CHART_FONT_FAMILY
+        self.n = n
+        dummy = self._dummy_frame(n)
+        self.fig, axes = mpf.plot(
+            dummy,
+            type='candle',
+            style='yahoo',
+            addplot=_addplots(_chart_series(dummy, 99, 102, 99, 102)),
+            title="",
+            ylabel="Price",
+            volume=True,
+            figscale=1.5,
+            returnfig=True
+        )
+        self.fig.subplots_adjust(left=0.08, right=0.92)
+        self.ax_main, self.volume_ax, self.rsi_ax, self.macd_ax = axes[0], axes[2], axes[4], axes[6]
+
+        # ✅ 差し替え対象の描画要素（偶数本目＝陽線、奇数本目＝陰線のダミーから色も拾う）
+        self.wicks, self.bodies = self.ax_main.collections[:2]
+        self.main_lines = list(self.ax_main.lines)
+        self.volume_bars = list(self.volume_ax.containers[0])
+        self.rsi_line = self.rsi_ax.lines[0]
+        self.macd_bars = list(self.macd_ax.containers[0])
+        self.macd_lines = list(self.macd_ax.lines)
+
+        face, edge, wick = self.bodies.get_facecolors(), self.bodies.get_edgecolors(), self.wicks.get_colors()
+        self.body_colors = (face[0], face[1 % len(face)])
+        self.edge_colors = (edge[0], edge[1 % len(edge)])
+        self.wick_colors = (wick[0], wick[1 % len(wick)])
+        self.volume_colors = (
+            (self.volume_bars[0].get_facecolor(), self.volume_bars[0].get_edgecolor()),
+            (self.volume_bars[1].get_facecolor(), self.volume_bars[1].get_edgecolor()),
+        )
+        xs = self.bodies.get_paths()[0].vertices[:, 0]
+        self.half_width = (xs.max() - xs.min()) / 2
+        self.formatter = self.ax_main.xaxis.get_major_formatter()
+
+        # ✅ チャートのxlimを拡張して重なり防止（日数単位での右余白）
+        x_min, x_max = self.ax_main.get_xlim()
+        extra_padding = 5
+        self.ax_main.set_xlim(x_min, x_max + extra_padding)
+
+        self._build_static()
+        self._static = {id(a) for ax in self.fig.axes for a in ax.get_children()}
+
+    @staticmethod
+    def _dummy_frame(n):
+        up = np.arange(n) % 2 == 0
+        opens = np.where(up, 100.0, 101.0)
+        closes = np.where(up, 101.0, 100.0)
+        df = pd.DataFrame({
+            "Open": opens, "High": 102.0, "Low": 99.0, "Close": closes, "Volume": 1000.0,
+        }, index=pd.bdate_range(end="2000-01-31", periods=n))
+        for col in ["MA5", "MA25", "MA75", "RSI", "MACD", "MACD_signal", "MACD_diff"]:
+            df[col] = closes
+        return df
+
+    def _build_static(self):
+        fig, ax_main = self.fig, self.ax_main
+        label_box = dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.7)
+
+        # 📝 タイトル & コメント（文字だけ銘柄ごとに差し替え）
+        self.title = fig.suptitle("", fontsize=12, fontweight='bold', ha='center', x=0.55, y=0.98)
+        self.zone_text = fig.text(
+            0.55, 0.92, "", ha='center', fontsize=9, wrap=True,
+            bbox=dict(facecolor="white", edgecolor='gray', boxstyle='round,pad=0.3', alpha=0.6)
+        )
+
+        # ✅ 移動平均線ラベルを左上に横並びで表示
+        spacing_x = 0.18  # ラベル間の横スペース（0.10〜0.18あたりで調整可能）
+        base_x = 0.01     # 左端の基準位置（横方向）
+        base_y = 0.98     # 上端の高さ位置
+        self.ma_texts = [
+            ax_main.text(base_x + i * spacing_x, base_y, "", transform=ax_main.transAxes,
+                         color=color, ha='left', va='top', fontsize=9, fontweight='bold', bbox=label_box)
+            for i, color in enumerate(["#1f77b4", "#ff7f0e", "#9467bd"])
+        ]
+
+        # S20 / R20 / S60 / R60（一番左の足の位置に表示）
+        self.level_labels = [
+            ax_main.annotate("", xy=(0, 0), xytext=(-10, 0), textcoords='offset points',
+                             ha='right', va='center', color=color, fontsize=8, fontweight='bold',
+                             bbox=dict(facecolor='white', alpha=0.6, boxstyle='round,pad=0.3'))
+            for color in ["green", "red", "green", "red"]
+        ]
+
+        # ✅ 当日の株価（終値）を注釈としてメインチャートに表示
+        self.price_text = ax_main.text(
+            0.88, 0.98, "", transform=ax_main.transAxes, ha='right', va='top',
+            fontsize=9, fontweight='bold', color='black',
+            bbox=dict(facecolor='white', alpha=0.7, boxstyle='round,pad=0.2')
+        )
+
+        # ===== 出来高パネルのカスタマイズ =====
+        volume_ax = self.volume_ax
+        volume_ax.text(
+            0.01, 1.0, "Volume Up", transform=volume_ax.transAxes,
+            ha='left', va='top', fontsize=9, fontweight='bold', color=VOLUME_LABEL_UP,
+            bbox=dict(facecolor='white', edgecolor=VOLUME_LABEL_UP, boxstyle='round,pad=0.2', alpha=0.8)
+        )
+        volume_ax.text(
+            0.15, 1.0, "Volume Down", transform=volume_ax.transAxes,
+            ha='left', va='top', fontsize=9, fontweight='bold', color=VOLUME_LABEL_DOWN,
+            bbox=dict(facecolor='white', edgecolor=VOLUME_LABEL_DOWN, boxstyle='round,pad=0.2', alpha=0.8)
+        )
+        # ✅ フォーマッタを明示的に設定（指数表記を抑制）
+        volume_ax.yaxis.set_major_formatter(FuncFormatter(english_volume_formatter))
+        volume_ax.set_ylabel("Volume")
+        # ✅ 当日の出来高数量を棒グラフ上に表示
+        self.volume_label = volume_ax.annotate(
+            "", xy=(0, 0), xytext=(-15, -12), textcoords="offset points",
+            ha='center', fontsize=9, fontweight='bold', color='black',
+            bbox=dict(facecolor='white', alpha=0.7, boxstyle='round,pad=0.2')
+        )
+
+        # ===== RSIパネルのカスタマイズ =====
+        rsi_ax = self.rsi_ax
+        rsi_ax.set_yticks([20, 50, 80])
+        rsi_ax.set_ylim(0, 100)
+        rsi_ax.axhline(y=20, color='green', linestyle='dotted', linewidth=1)
+        rsi_ax.axhline(y=80, color='red', linestyle='dotted', linewidth=1)
+        self.rsi_label = rsi_ax.annotate(
+            "", xy=(0, 0), xytext=(0, -12), textcoords="offset points",
+            ha='center', fontsize=9, fontweight='bold', color='black',
+            bbox=dict(facecolor='white', alpha=0.7, boxstyle='round,pad=0.2')
+        )
+
+        # ===== MACDパネルのカスタマイズ =====
+        macd_ax = self.macd_ax
+        macd_ax.axhline(y=0, color='gray', linestyle='dotted', linewidth=1)
+        # 凡例は棒（Diff）と4本の線を明示して対応を固定する
+        macd_ax.legend(
+            [self.macd_ax.containers[0], *self.macd_lines],
+            ["Diff", "MACD↑", "MACD↓", "Signal↑", "Signal↓"], loc='upper left', fontsize=8
+        )
+
+    def clear(self):
+        """
+        前の銘柄で追加したゾーン・マーカー・出来高プロファイル等を取り除く。
+        """
+        for ax in self.fig.axes:
+            for artist in ax.get_children():
+                if id(artist) not in self._static:
+                    artist.remove()
+
+    def set_data(self, df_recent, series):
+        n = self.n
+        x = np.arange(n, dtype=np.float64)
+        o = df_recent["Open"].to_numpy(dtype=np.float64)
+        h = df_recent["High"].to_numpy(dtype=np.float64)
+        l = df_recent["Low"].to_numpy(dtype=np.float64)
+        c = df_recent["Close"].to_numpy(dtype=np.float64)
+        v = df_recent["Volume"].to_numpy(dtype=np.float64)
+
+        # 🕯 ローソク足（mplfinance と同じく open < close を陽線とする）
+        up = o < c
+        w = self.half_width
+        self.bodies.set_verts(np.stack([
+            np.column_stack([x - w, o]), np.column_stack([x - w, c]),
+            np.column_stack([x + w, c]), np.column_stack([x + w, o]),
+        ], axis=1))
+        self.bodies.set_facecolors([self.body_colors[0] if u else self.body_colors[1] for u in up])
+        self.bodies.set_edgecolors([self.edge_colors[0] if u else self.edge_colors[1] for u in up])
+        self.wicks.set_segments(
+            [((xi, lo), (xi, min(oi, ci))) for xi, lo, oi, ci in zip(x, l, o, c)]
+            + [((xi, hi), (xi, max(oi, ci))) for xi, hi, oi, ci in zip(x, h, o, c)]
+        )
+        wick = [self.wick_colors[0] if u else self.wick_colors[1] for u in up]
+        self.wicks.set_colors(wick + wick)
+
+        # 📊 出来高（前日終値より上げたら陽線色）
+        vol_up = np.r_[o[0] < c[0], c[1:] > c[:-1]]
+        for bar, height, is_up in zip(self.volume_bars, v, vol_up):
+            face, edge = self.volume_colors[0 if is_up else 1]
+            bar.set_height(height)
+            bar.set_facecolor(face)
+            bar.set_edgecolor(edge)
+        self.volume_ax.set_ylim(0.3 * np.nanmin(v), 1.1 * np.nanmax(v))
+
+        # 📈 線・棒
+        for line, values in zip(self.main_lines, series["main"]):
+            line.set_ydata(np.asarray(values, dtype=np.float64))
+        self.rsi_line.set_ydata(series["rsi"].to_numpy(dtype=np.float64))
+        for bar, height in zip(self.macd_bars, series["macd_bar"].to_numpy(dtype=np.float64)):
+            bar.set_height(height)
+        for line, values in zip(self.macd_lines, series["macd"]):
+            line.set_ydata(values.to_numpy(dtype=np.float64))
+
+        # 📅 横軸の日付
+        dates = pd.DatetimeIndex(df_recent.index)
+        self.formatter.dates = mdates.date2num(dates.to_pydatetime())
+        self.formatter.len = n
+        # mplfinance と同じ書式（年をまたぐときだけ年を付ける）
+        self.formatter.fmt = '%b %d' if dates[0].year == dates[-1].year else '%Y-%b-%d'
+
+        # ↕ 縦軸の範囲（mplfinance と同じく足の高安＋線から自動決定 → 上下に10%余白）
+        ax_main = self.ax_main
+        avg = (n - 1) / n
+        ax_main.relim()
+        ax_main.update_datalim([(-avg, np.nanmin(l)), (n - 1 + avg, np.nanmax(h))])
+        ax_main.set_autoscaley_on(True)
+        ax_main.autoscale_view(scalex=False)
+        ymin, ymax = ax_main.get_ylim()
+        padding = (ymax - ymin) * 0.1  # ← 10%余白（好みで変更可）
+        ax_main.set_ylim(ymin - padding, ymax + padding)
+
+        self.macd_ax.relim()
+        self.macd_ax.set_autoscaley_on(True)
+        self.macd_ax.autoscale_view(scalex=False)
+
+_templates = {}
+
+def get_chart_template(n):
+    if n not in _templates:
+        _templates[n] = ChartTemplate(n)
+    return _templates[n]
+
+# ==========================
+# 価格帯別出来高（PVSRA風）
+# ==========================
+
+VOLUME_PROFILE_BIN_SIZE = 25   # 基本の刻み幅（円）
+VOLUME_PROFILE_MAX_BINS = 60   # 刻み数の上限（超える値がさは刻み幅を25円単位で広げる）
+
+def volume_profile(df_recent, bin_size=VOLUME_PROFILE_BIN_SIZE, max_bins=VOLUME_PROFILE_MAX_BINS):
+    """
+    終値の価格帯ごとに陽線/陰線の出来高を合計する。
+    戻り値：(各価格帯の下端, 陽線出来高, 陰線出来高, 刻み幅)
+    """
+    low_price = int(df_recent["Low"].min())
+    high_price = int(df_recent["High"].max())
+    n_bins = (high_price - low_price) // bin_size + 1
+    if n_bins > max_bins:
+        bin_size *= -(-n_bins // max_bins)  # 切り上げ倍率
+        n_bins = (high_price - low_price) // bin_size + 1
+
+    close = df_recent["Close"].to_numpy(dtype=np.float64)
+    volume = df_recent["Volume"].to_numpy(dtype=np.float64)
+    is_up = close > df_recent["Open"].to_numpy(dtype=np.float64)
+
+    # ✅ 価格帯番号を一括計算し、出来高を重み付きで集計（価格帯ごとのループなし）
+    bin_idx = np.floor((close - low_price) / bin_size).astype(np.int64)
+    valid = (bin_idx >= 0) & (bin_idx < n_bins)
+    pos_vol = np.bincount(bin_idx[valid & is_up], weights=volume[valid & is_up], minlength=n_bins)
+    neg_vol = np.bincount(bin_idx[valid & ~is_up], weights=volume[valid & ~is_up], minlength=n_bins)
+    bin_lows = low_price + np.arange(n_bins) * bin_size
+    return bin_lows, pos_vol, neg_vol, bin_size
+
+def plot_chart(df, symbol, name):
+
+    recent_days = CHART_RECENT_DAYS
+    df_recent = df.tail(recent_days).copy()
+
+    latest = df_recent.iloc[-1]
+
+    if latest["MA5"] > latest["MA25"] > latest["MA75"]:
+        trend_text = "UP"
+    elif latest["MA5"] < latest["MA25"] < latest["MA75"]:
+        trend_text = "DOWN"
+    else:
+        trend_text = "SIDEWAY"
+
+    # ✅ 動的ゾーンを取得（関数呼び出し）
+    oshime_low, oshime_high, profit_target = judge_dynamic_zones(latest)
+ 
+    support_20 = df_recent["Low"].tail(20).min()
+    resist_20 = df_recent["High"].tail(20).max()
+    support_60 = df_recent["Low"].tail(60).min()
+    resist_60 = df_recent["High"].tail(60).max()
+
+    # ✅ ひな形を取り出し、前の銘柄の追加分を消してデータを差し替え
+    template = get_chart_template(len(df_recent))
+    template.clear()
+    template.set_data(df_recent, _chart_series(df_recent, support_20, resist_20, support_60, resist_60))
+    ax_main = template.ax_main
+
+    # 📝 タイトル & コメント
+    template.title.set_text(f"{name} ({symbol}) {recent_days} DaysChart / Trend: {trend_text}")
+
+    zone_comment, comment_color = generate_zone_comment(
+        close=latest["Close"],
+        profit_target=profit_target,
+        oshime_low=oshime_low,
+        oshime_high=oshime_high,
+        rsi=latest["RSI"],
+        adx=latest["ADX"],
+        trend=trend_text
+    )
+    template.zone_text.set_text(zone_comment)
+    template.zone_text.get_bbox_patch().set_facecolor(comment_color)
+
+    # 🔁 PVSRA風 価格別出来高ヒストグラム（左右分離型・重なり回避付き）
+    # =========================================================
+    low_price = df_recent["Low"].min()
+    bin_lows, pos_vol, neg_vol, bin_size = volume_profile(df_recent)
+
+    # 最大出来高からスケーリング比率を計算（横幅を20%以内に）
+    max_volume = (pos_vol + neg_vol).max() or 1
+    max_bar_len = len(df_recent) * 0.2
+    scale = max_bar_len / max_volume
+
+    # チャート右外に描画開始（x軸右端よりさらに右へ）
+    x_center = len(df_recent) + 4  # 中心線（左右へバーが伸びる）
+    y_pos = bin_lows + bin_size / 2
+
+    # 🎨 ヒストグラム描画（左右分離：緑→右／赤→左）：色ごとに hlines 1回（LineCollection 1つ）
+    has_pos, has_neg = pos_vol > 0, neg_vol > 0
+    if has_pos.any():
+        ax_main.hlines(y=y_pos[has_pos], xmin=x_center, xmax=x_center + pos_vol[has_pos] * scale,
+                       color='green', linewidth=5, alpha=0.4)
+    if has_neg.any():
+        ax_main.hlines(y=y_pos[has_neg], xmin=x_center, xmax=x_center - neg_vol[has_neg] * scale,
+                       color='red', linewidth=3, alpha=0.4)
+
+    # 💬 ラベル（少し右にずらして表示）
+    ax_main.text(
+        x_center + 1.2, low_price, "Buy ▶", color='green', fontsize=7, ha='left'
+    )
+    ax_main.text(
+        x_center - 1.2, low_price, "◀ Sell", color='red', fontsize=7, ha='right'
+    )
+
+    x = range(len(df_recent))
+    # 押し目ゾーン（緑）
+    ax_main.fill_between(
+        x, oshime_low, oshime_high,
+        where=[True] * len(df_recent),
+        facecolor='green', alpha=0.15, label='押し目ゾーン'
+    )
+    # 利確ゾーン（オレンジ）
+    ax_main.fill_between(
+        x, profit_target, df_recent["High"].max(),
+        where=[True] * len(df_recent),
+        facecolor='orange', alpha=0.15, label='利確ゾーン'
+    )
+
+    # ✅ 押し目マーカー表示（緑の●）
+    oshime_condition = (
+        (df_recent["RSI"] > 40) & (df_recent["RSI"] < 55) &
+        (df_recent["Close"] >= df_recent["MA25"] * 0.97) & (df_recent["Close"] <= df_recent["MA25"])
+    )
+    x_all = np.arange(len(df_recent))
+    if oshime_condition.any():
+        ax_main.scatter(x_all[oshime_condition.to_numpy()], df_recent["Low"][oshime_condition],
+                        marker='o', color='green', s=6 ** 2, zorder=5)
+
+    # ✅ 売りときマーカー表示（赤い✕）
+    uri_condition = (
+        (df_recent["RSI"] >= 70) &
+        (df_recent["Close"] >= profit_target)
+    )
+    if uri_condition.any():
+        ax_main.scatter(x_all[uri_condition.to_numpy()], df_recent["High"][uri_condition],
+                        marker='x', color='red', s=7 ** 2, linewidths=1, zorder=6)
+
+    x = range(len(df_recent))
+    senkou1 = df_recent["senkou1"]
+    senkou2 = df_recent["senkou2"]
+    ax_main.fill_between(x, senkou1, senkou2, where=(senkou1 > senkou2), facecolor="#a8e6cf", alpha=0.3)
+    ax_main.fill_between(x, senkou1, senkou2, where=(senkou1 <= senkou2), facecolor="#ff8b94", alpha=0.3)
+
+    # ✅ 一目均衡表「ねじれ」検出（交差点）
+    twist_points = df_recent[(df_recent["senkou1"] > df_recent["senkou2"]).shift(1) &
+                             (df_recent["senkou1"] <= df_recent["senkou2"]) |
+                             (df_recent["senkou1"] < df_recent["senkou2"]).shift(1) &
+                             (df_recent["senkou1"] >= df_recent["senkou2"])]
+
+    if len(twist_points):
+        # 交点の少し下に「×」（旧 annotate の offset points と同じく pt 単位でずらす）
+        below = mtransforms.offset_copy(ax_main.transData, fig=template.fig, y=-7, units='points')
+        ax_main.scatter(df_recent.index.get_indexer(twist_points.index),
+                        (twist_points["senkou1"] + twist_points["senkou2"]) / 2,
+                        marker='$×$', color='gray', s=6 ** 2, linewidths=0, transform=below)
+
+    # ✅ 移動平均線ラベル・S/R・終値
+    template.ma_texts[0].set_text(f"05DMA: {latest['MA5']:,.1f}")
+    template.ma_texts[1].set_text(f"25DMA: {latest['MA25']:,.1f}")
+    template.ma_texts[2].set_text(f"75DMA: {latest['MA75']:,.1f}")
+
+    x_first_idx = 0  # 一番左のインデックス
+    for label, (text, value) in zip(template.level_labels, [
+        ("S20", support_20), ("R20", resist_20), ("S60", support_60), ("R60", resist_60),
+    ]):
+        label.xy = (x_first_idx, value)
+        label.set_text(f"{text}: {value:.1f}")
+
+    latest_close = df_recent["Close"].iloc[-1]
+    template.price_text.set_text(f"Price: {latest_close:.1f}")
+
+    # ✅ 当日の出来高数量（パネルのY軸上限値＝棒グラフより上の空間を使う）
+    last_index = len(df_recent) - 1
+    last_volume = df_recent["Volume"].iloc[-1]
+    ylim_top = template.volume_ax.get_ylim()[1]
+    template.volume_label.xy = (last_index - 2, ylim_top)
+    template.volume_label.set_text(f"Volume: {format_volume_label(last_volume)}")
+
+    # ✅ RSI の最新値
+    latest_rsi = df_recent["RSI"].iloc[-1]
+    x_last = len(df_recent) - 1
+    template.rsi_label.xy = (x_last - 3, latest_rsi)
+    template.rsi_label.set_text(f"RSI: {latest_rsi:.1f}")
+
+    # ✅ ゴールデンクロス検出＆青丸マーカー表示
+    macd_ax = template.macd_ax
+    macd_cross = (df_recent["MACD"].shift(1) < df_recent["MACD_signal"].shift(1)) & \
+                (df_recent["MACD"] > df_recent["MACD_signal"])
+
+    if macd_cross.any():
+        macd_ax.scatter(x_all[macd_cross.to_numpy()], df_recent["MACD"][macd_cross],
+                        marker='o', color='green', s=6 ** 2, zorder=5)
+
+    # 📅 今日の日付（例: 2025-06-21）
+    today_str = datetime.now().strftime('%Y-%m-%d')
+
+    # 📁 出力先ディレクトリ（例: chart/2385-モンスターラボ）
+    folder_name = f"output/{today_str}" #{symbol}-{name}
+    os.makedirs(folder_name, exist_ok=True)  # フォルダがなければ作成
+
+    # 🖼 保存ファイル名（例: chart_2385_2025-06-21.png）
+    import re
+    safe_name = re.sub(r'[\\/*?:"<>|]', '_', name)
+    #file_name = f"chart_{symbol}_{today_str}.png"
+    file_name = f"chart_{symbol}_{safe_name}_{today_str}.png"
+    save_path = os.path.join(folder_name, file_name)
+
+    # 💾 保存（メモリ上の PNG をそのまま書き出し、ハッシュもここで1回だけ計算）
+    artifact = ImageArtifact.from_figure(template.fig, save_path)
+    #print(f"📈 Saved with MA, S/R lines, and Ichimoku Cloud (filled): {save_path}")
+    #print(f"📈 {save_path}")
+
+    signals = analyze_signals(df_recent)  
+    signal_comment = generate_signal_comment(signals)
+
+    return artifact, signals, signal_comment
\ No newline at end of file
@@ -0,0 +1,122 @@
+# ==============================
+# Sec｜chart_renderer.py｜チャート描画をプロセスプールで並列実行する
+# ==============================
+
+import os
+import time
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from chart_config import CHART_COLUMNS, CHART_RECENT_DAYS
+
+# 描画プロセス数（メインプロセスの取得・分析用に1コア残す）
+RENDER_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+def chart_payload(df, symbol, name):
+    """
+    描画に必要な分だけ（直近 CHART_RECENT_DAYS 本 × CHART_COLUMNS）を配列にまとめる。
+    DataFrame 全体を送るより pickle が小さく速い。
+    """
+    df_recent = df.tail(CHART_RECENT_DAYS)
+    return {
+        "symbol": symbol,
+        "name": name,
+        "dates": pd.DatetimeIndex(df_recent.index),  # 単位・タイムゾーンごと送る
+        "values": np.ascontiguousarray(df_recent.reindex(columns=CHART_COLUMNS).to_numpy(dtype=np.float64)),
+    }
+
+def frame_from_payload(payload):
+    return pd.DataFrame(payload["values"], columns=CHART_COLUMNS,
+                        index=payload["dates"])
+
+def _init_worker():
+    """
+    ワーカー起動時に1回だけ：matplotlib / mplfinance / フォントを読み込み、図のひな形を作っておく。
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import chart_config
+    chart_config.get_chart_template(CHART_RECENT_DAYS)
+
+def render_payload(payload):
+    """
+    ワーカーで1銘柄を描画して保存し、(画像パス, ハッシュ, PNGのバイト列) を返す。
+    バイト列も送り返すので、アップロードのためにメインプロセスで画像を読み直さなくてよい。
+    """
+    from chart_config import plot_chart
+    artifact, _, _ = plot_chart(frame_from_payload(payload), payload["symbol"], payload["name"])
+    return artifact.path, artifact.hash, artifact.data
+
+def render_payload_traced(payload):
+    """
+    render_payload と同じ。加えて描画した区間（プロセスID・スレッドID・開始・終了）を返す。
+    """
+    start = time.perf_counter_ns() / 1000
+    result = render_payload(payload)
+    span = (os.getpid(), threading.get_native_id(), start, time.perf_counter_ns() / 1000)
+    return result, span
+
+def _ready():
+    return os.getpid()
+
+class ChartRenderPool:
+    """
+    plot_chart をプロセスプールで実行する。submit は (画像パス, ハッシュ, PNGのバイト列) の Future を返す。
+    max_workers=0 ならメインプロセス内でその場で描画する（デバッグ用）。
+    ※ 子プロセスは OS によらず spawn で作る（Windows と同じ動き。スレッドを持つ親を fork しない）。
+    　spawn の子はメインスクリプトを読み直すので、呼び出し側は import 時に DB 初期化などの処理をしないこと。
+    """
+    def __init__(self, max_workers=RENDER_WORKERS, tracer=None):
+        self.max_workers = max_workers
+        # tracer（trace_events.TraceRecorder）を渡すと、ワーカー側の描画区間をそのプロセスIDで記録する
+        self.tracer = tracer if tracer is not None and tracer.enabled else None
+        self._executor = None
+        if max_workers:
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            # ✅ ここで全ワーカーを起動してひな形まで作らせる（初回描画の待ちをなくす）
+            for future in [self._executor.submit(_ready) for _ in range(max_workers)]:
+                future.result()
+
+    def submit(self, df, symbol, name):
+        payload = chart_payload(df, symbol, name)
+        if self._executor is not None and self.tracer is not None:
+            return self._submit_traced(payload)
+        if self._executor is not None:
+            return self._executor.submit(render_payload, payload)
+        future = Future()
+        try:
+            future.set_result(render_payload(payload))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def _submit_traced(self, payload):
+        outer = Future()
+
+        def done(inner):
+            try:
+                result, (pid, tid, start, end) = inner.result()
+            except Exception as e:
+                outer.set_exception(e)
+                return
+            self.tracer.name_process(pid, "render-worker")
+            self.tracer.add_span("plot_chart", start, end, cat="render", pid=pid, tid=tid,
+                                 thread_name="render", symbol=payload["symbol"])
+            outer.set_result(result)
+
+        self._executor.submit(render_payload_traced, payload).add_done_callback(done)
+        return outer
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
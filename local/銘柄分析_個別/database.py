@@ -2,97 +2,432 @@
 # Sec｜database.py
 # ==============================
 
+import json
 import sqlite3
+import queue
+import threading
+import time
+import atexit
+import numpy as np
 import pandas as pd
+from concurrent.futures import Future
+from contextlib import contextmanager
 from pathlib import Path
 import os
 
 DB_PATH = Path("result/stock_data.db")
 
+# ✅ 接続設定（WAL：書き込み中でも別プロセス・ダッシュボードから読める）
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",   # WAL では NORMAL でも破損しない（電源断時に直近コミットのみ失う可能性）
+    "temp_store": "MEMORY",
+    "cache_size": -64000,      # 約64MB
+    "mmap_size": 268435456,    # 256MB
+    "busy_timeout": 10000,     # ms
+}
+
+# ✅ 書き込みスレッドのまとめコミット設定
+WRITER_BATCH_SIZE = 50     # 1コミットあたりの最大書き込み件数
+WRITER_MAX_DELAY = 1.0     # 最初の1件からコミットまで待つ最大秒数
+
+# ==========================
+# 接続管理（1プロセス1接続）
+# ==========================
+
+_conn = None
+_conn_pid = None
+_conn_lock = threading.RLock()
+
+def open_connection(db_path=DB_PATH, **kwargs):
+    os.makedirs(Path(db_path).parent, exist_ok=True)
+    conn = sqlite3.connect(db_path, **kwargs)
+    for key, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {key}={value}")
+    return conn
+
+def get_connection():
+    """
+    プロセス内で共有する接続を返す（fork 後の子プロセスでは開き直す）。
+    """
+    global _conn, _conn_pid
+    with _conn_lock:
+        if _conn is None or _conn_pid != os.getpid():
+            _conn = open_connection(check_same_thread=False)
+            _conn_pid = os.getpid()
+        return _conn
+
+def close_connection():
+    global _conn, _conn_pid
+    with _conn_lock:
+        if _conn is not None and _conn_pid == os.getpid():
+            _conn.close()
+        _conn, _conn_pid = None, None
+
+atexit.register(close_connection)
+
+@contextmanager
+def connection():
+    """
+    共有接続をロック付きで使う。ブロックを抜けるとコミット（例外時はロールバック）。
+    """
+    with _conn_lock:
+        conn = get_connection()
+        with conn:
+            yield conn
+
 def load_latest_data():
-    with sqlite3.connect(DB_PATH) as conn:
+    with connection() as conn:
         latest_date = pd.read_sql_query("SELECT MAX(date) as max_date FROM price_history", conn)["max_date"][0]
         df = pd.read_sql_query(f"SELECT * FROM price_history WHERE date = '{latest_date}'", conn)
     return df
 
+def load_price_history(symbol):
+    """
+    指定銘柄の保存済みOHLCVを日付順で読み込む（stock_data の差分取得用）。
+    戻り値：(Date をインデックスとした Open/High/Low/Close/Volume の DataFrame, 保存済みの銘柄名 or None)
+    """
+    if not DB_PATH.exists():
+        return pd.DataFrame(), None
+    with connection() as conn:
+        df = pd.read_sql_query("""
+            SELECT date, name, open, high, low, close, volume
+            FROM price_history WHERE symbol = ? ORDER BY date;
+        """, conn, params=(symbol,))
+    if df.empty:
+        return pd.DataFrame(), None
+
+    name = df["name"].dropna().iloc[-1] if df["name"].notna().any() else None
+    df = df.drop_duplicates(subset=["date"], keep="last")
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("date")), name="Date")
+    df = df.drop(columns=["name"]).rename(columns={
+        "open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume"
+    })
+    return df, name
+
+def load_all_price_history(since=None):
+    """
+    全銘柄の保存済みOHLCVを (symbol, date) 順で読み込む（analyzer.scan_universe 用）。
+    since（'YYYY-MM-DD'）を指定するとその日以降のみ。
+    """
+    if not DB_PATH.exists():
+        return pd.DataFrame(columns=["symbol", "name", "date", "open", "high", "low", "close", "volume"])
+    query = "SELECT symbol, name, date, open, high, low, close, volume FROM price_history"
+    params = ()
+    if since:
+        query += " WHERE date >= ?"
+        params = (since,)
+    with connection() as conn:
+        return pd.read_sql_query(query + " ORDER BY symbol, date", conn, params=params)
+
+# price_history の列（DB列名 → DataFrame側の列名）
+PRICE_COLUMNS = {
+    "open": "Open", "high": "High", "low": "Low", "close": "Close", "volume": "Volume",
+    "ma5": "MA5", "ma25": "MA25", "ma75": "MA75", "rsi": "RSI",
+    "macd": "MACD", "macd_signal": "MACD_signal", "macd_diff": "MACD_diff",
+    "adx": "ADX", "stoch_k": "STOCH_K", "senkou1": "senkou1", "senkou2": "senkou2",
+    "bb_upper": "BB_upper", "bb_middle": "BB_middle", "bb_lower": "BB_lower",
+    "kairi_25": "KAIRI_25", "atr": "ATR",
+}
+PRICE_KEY_COLUMNS = ["date", "symbol", "name"]
+VOLUME_POS = list(PRICE_COLUMNS).index("volume")
+
+PRICE_HISTORY_DDL = """
+CREATE TABLE IF NOT EXISTS price_history (
+    date TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    name TEXT,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER,
+    ma5 REAL,
+    ma25 REAL,
+    ma75 REAL,
+    rsi REAL,
+    macd REAL,
+    macd_signal REAL,
+    macd_diff REAL,
+    adx REAL,
+    stoch_k REAL,
+    senkou1 REAL,
+    senkou2 REAL,
+    bb_upper REAL,     -- ✅ 追加
+    bb_middle REAL,    -- ✅ 中央線（＝移動平均）
+    bb_lower REAL,     -- ✅ 追加
+    kairi_25 REAL,     -- ✅ 25日乖離率を追加
+    atr REAL,          -- ✅ ATRを追加
+    PRIMARY KEY (symbol, date)
+)
+"""
+
+def _has_primary_key(conn):
+    pk = [row[1] for row in conn.execute("PRAGMA table_info(price_history)") if row[5] > 0]
+    return sorted(pk) == ["date", "symbol"]
+
+def _migrate_price_history(conn):
+    """
+    主キーなしの旧テーブルを (symbol, date) 主キー付きに作り直す。
+    重複行は後から入った行（rowid が大きい方）を残す。
+    """
+    print("🛠️ price_history を (symbol, date) 主キー付きに移行します")
+    cols = ", ".join(PRICE_KEY_COLUMNS + list(PRICE_COLUMNS))
+    conn.execute("ALTER TABLE price_history RENAME TO price_history_old")
+    conn.execute("DROP INDEX IF EXISTS idx_symbol_date")
+    conn.execute(PRICE_HISTORY_DDL)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO price_history ({cols})
+        SELECT {cols} FROM price_history_old
+        WHERE date IS NOT NULL AND symbol IS NOT NULL
+        ORDER BY rowid
+    """)
+    conn.execute("DROP TABLE price_history_old")
+
 def init_db():
     os.makedirs(DB_PATH.parent, exist_ok=True)
-    with sqlite3.connect(DB_PATH) as conn:
-        # ✅ テーブル作成
-        conn.execute("""
-        CREATE TABLE IF NOT EXISTS price_history (
-            date TEXT,
-            symbol TEXT,
-            name TEXT,
-            open REAL,
-            high REAL,
-            low REAL,
-            close REAL,
-            volume INTEGER,
-            ma5 REAL,
-            ma25 REAL,
-            ma75 REAL,
-            rsi REAL,
-            macd REAL,
-            macd_signal REAL,
-            macd_diff REAL,
-            adx REAL,
-            stoch_k REAL,
-            senkou1 REAL,
-            senkou2 REAL,
-            bb_upper REAL,     -- ✅ 追加
-            bb_middle REAL,    -- ✅ 中央線（＝移動平均）
-            bb_lower REAL,     -- ✅ 追加
-            kairi_25 REAL,     -- ✅ 25日乖離率を追加
-            atr REAL           -- ✅ ATRを追加
-        )
-        """)
-        # ✅ インデックス作成
+    with connection() as conn:
+        # ✅ テーブル作成（(symbol, date) 主キー：同じ日付の重複登録を防ぐ）
+        conn.execute(PRICE_HISTORY_DDL)
+        if not _has_primary_key(conn):
+            _migrate_price_history(conn)
+        # ✅ インデックス作成（主キーと同じ並びだが既存DBとの互換のため残す）
         conn.execute("""
         CREATE INDEX IF NOT EXISTS idx_symbol_date 
         ON price_history(symbol, date)
         """)
+        # ✅ 指標の逐次計算用の状態（銘柄ごとに最新1件）
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS indicator_state (
+            symbol TEXT PRIMARY KEY,
+            date TEXT,
+            state TEXT
+        )
+        """)
+
+def _price_rows(df, symbol, name):
+    """
+    1銘柄分の DataFrame を price_history 用のタプル列に変換する（行ごとの apply は使わない）。
+    DataFrame にない列は None（既存値を保持）になる。
+    """
+    n = len(df)
+    if n == 0:
+        return []
+    dates = pd.DatetimeIndex(df.index).strftime("%Y-%m-%d").tolist()
+    values = np.full((n, len(PRICE_COLUMNS)), np.nan)
+    for i, df_col in enumerate(PRICE_COLUMNS.values()):
+        if df_col in df.columns:
+            values[:, i] = pd.to_numeric(df[df_col], errors="coerce").to_numpy(dtype=np.float64)
+    missing = np.isnan(values)
+    cells = values.astype(object)
+    cells[:, VOLUME_POS] = [int(v) for v in values[:, VOLUME_POS].round().astype(np.int64)]
+    cells[missing] = None
+    return [(d, symbol, name, *row) for d, row in zip(dates, cells.tolist())]
+
+def _upsert_sql():
+    cols = PRICE_KEY_COLUMNS + list(PRICE_COLUMNS)
+    value_cols = ["name"] + list(PRICE_COLUMNS)
+    # 値が変わっていない行は更新しない（changes が「新規＋変更」件数になる。NULL の入力は既存値のままなので変更に数えない）
+    updates = ", ".join(f"{c} = COALESCE(excluded.{c}, price_history.{c})" for c in value_cols)
+    changed = " OR ".join(f"COALESCE(excluded.{c}, price_history.{c}) IS NOT price_history.{c}" for c in value_cols)
+    return f"""
+        INSERT INTO price_history ({", ".join(cols)})
+        VALUES ({", ".join("?" for _ in cols)})
+        ON CONFLICT(symbol, date) DO UPDATE SET {updates}
+        WHERE {changed}
+    """
+
+def write_price_data(conn, items):
+    """
+    渡された接続で複数銘柄を upsert する（コミットは呼び出し側）。
+    items：[(df, symbol, name), ...]
+    戻り値：{symbol: {"status", "count"}}（count は新規＋値が変わった行数）
+    """
+    sql = _upsert_sql()
+    results = {}
+    for df, symbol, name in items:
+        before = conn.total_changes
+        conn.executemany(sql, _price_rows(df, symbol, name))
+        count = conn.total_changes - before
+        results[symbol] = {
+            "status": "inserted" if count > 0 else "skipped",
+            "count": count,
+        }
+    return results
+
+def save_price_data_bulk(items):
+    """
+    複数銘柄をまとめて upsert する（1トランザクション・executemany）。
+    """
+    with connection() as conn:
+        return write_price_data(conn, items)
 
 def save_price_data(df, symbol, name):
-    df = df.copy()
-    df["symbol"] = symbol
-    df["name"] = name
-    df["date"] = df.index.strftime("%Y-%m-%d")
-    df = df.reset_index()
-
-    # ✅ 必要な列のみ抽出
-    cols = [c for c in df.columns if c in {
-        "date", "symbol", "name", "Open", "High", "Low", "Close", "Volume",
-        "MA5", "MA25", "MA75", "RSI", "MACD", "MACD_signal", "MACD_diff",
-        "ADX", "STOCH_K", "senkou1", "senkou2",
-        "BB_upper", "BB_middle", "BB_lower",
-        "KAIRI_25", "ATR"
-    }]
-    df = df[cols]
-    df.columns = [c.lower() for c in df.columns]
-    df = df.drop_duplicates(subset=["symbol", "date"])
-
-    # ✅ 保存前に現在DBにあるデータを読み込んで差分をとる
-    import sqlite3
-    from pathlib import Path
-
-    DB_PATH = Path("result/stock_data.db")
-
-    with sqlite3.connect(DB_PATH) as conn:
-        # 現在のDBに存在するsymbol+dateの組み合わせを取得
-        existing = pd.read_sql_query("""
-            SELECT symbol, date FROM price_history WHERE symbol = ?;
-        """, conn, params=(symbol,))
-        existing_keys = set(zip(existing["symbol"], existing["date"]))
+    return save_price_data_bulk([(df, symbol, name)])[symbol]
+
+def load_indicator_state(symbol):
+    """
+    保存済みの指標状態を返す。戻り値：(最終反映日 'YYYY-MM-DD', 状態dict) または (None, None)
+    """
+    if not DB_PATH.exists():
+        return None, None
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT date, state FROM indicator_state WHERE symbol = ?", (symbol,)
+        ).fetchone()
+    if row is None:
+        return None, None
+    return row[0], json.loads(row[1])
+
+def load_indicator_history(symbol, start, end):
+    """
+    price_history に保存済みの指標（start〜end の日付、両端を含む）を Date インデックスで返す（逐次更新用）。
+    列名は DataFrame 側（MA5, RSI, ...）。OHLCV は含まない。
+    """
+    cols = {db: df_col for db, df_col in PRICE_COLUMNS.items() if db not in ("open", "high", "low", "close", "volume")}
+    if not DB_PATH.exists():
+        return pd.DataFrame(columns=list(cols.values()))
+    with connection() as conn:
+        df = pd.read_sql_query(
+            f"SELECT date, {', '.join(cols)} FROM price_history "
+            "WHERE symbol = ? AND date BETWEEN ? AND ? ORDER BY date",
+            conn, params=(symbol, start, end),
+        )
+    df = df.drop_duplicates(subset=["date"], keep="last")
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("date")), name="Date")
+    return df.rename(columns=cols).astype(np.float64)
+
+def write_indicator_state(conn, symbol, date, state):
+    conn.execute(
+        "INSERT OR REPLACE INTO indicator_state (symbol, date, state) VALUES (?, ?, ?)",
+        (symbol, date, json.dumps(state)),
+    )
+
+def save_indicator_state(symbol, date, state):
+    with connection() as conn:
+        write_indicator_state(conn, symbol, date, state)
+
+# ==========================
+# 書き込みスレッド（キューに積んでまとめてコミット）
+# ==========================
+
+class DBWriter:
+    """
+    書き込みをキューに積み、専用スレッドが専用接続でまとめてコミットする。
+    チャート描画や指標計算のスレッドはディスクの fsync を待たない。
+    submit した処理の結果・例外は Future で受け取れる。
+    """
+    _STOP = object()
+
+    def __init__(self, db_path=DB_PATH, batch_size=WRITER_BATCH_SIZE, max_delay=WRITER_MAX_DELAY):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, func, *args):
+        """
+        func(conn, *args) を書き込みスレッドで実行する。戻り値は Future。
+        """
+        if self._thread is None:
+            raise RuntimeError("DBWriter が開始されていません（start() を先に呼んでください）")
+        future = Future()
+        self._queue.put((func, args, future))
+        return future
+
+    def save_price_data(self, df, symbol, name):
+        return self.submit(lambda conn: write_price_data(conn, [(df, symbol, name)])[symbol])
+
+    def save_price_data_bulk(self, items):
+        return self.submit(write_price_data, list(items))
+
+    def save_indicator_state(self, symbol, date, state):
+        return self.submit(write_indicator_state, symbol, date, state)
+
+    def flush(self):
+        """
+        ここまでに積んだ書き込みがすべてコミットされるまで待つ。
+        """
+        self._queue.join()
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
 
-        # 新規のみ抽出
-        df_new = df[~df.apply(lambda row: (row["symbol"], row["date"]) in existing_keys, axis=1)]
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        if first is self._STOP:
+            return batch
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is self._STOP:
+                break
+        return batch
 
-        # 登録
-        if not df_new.empty:
-            df_new.to_sql("price_history", conn, if_exists="append", index=False)
+    def _run(self):
+        conn = open_connection(self.db_path, isolation_level=None)
+        try:
+            while True:
+                batch = self._collect()
+                stop = batch[-1] is self._STOP
+                tasks = batch[:-1] if stop else batch
+                self._execute(conn, tasks)
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    break
+        finally:
+            conn.close()
 
-    return {
-        "status": "inserted" if len(df_new) > 0 else "skipped",
-        "count": len(df_new)
-    }
+    def _execute(self, conn, tasks):
+        if not tasks:
+            return
+        done = []
+        conn.execute("BEGIN")
+        for func, args, future in tasks:
+            # 1件の失敗で同じコミットの他の書き込みを巻き戻さないよう SAVEPOINT で区切る
+            conn.execute("SAVEPOINT task")
+            try:
+                result = func(conn, *args)
+                conn.execute("RELEASE task")
+                done.append((future, result))
+            except Exception as e:
+                conn.execute("ROLLBACK TO task")
+                conn.execute("RELEASE task")
+                future.set_exception(e)
+        try:
+            conn.execute("COMMIT")
+        except Exception as e:
+            print(f"❌ DB書き込み失敗（{len(done)}件）: {e}")
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for future, _ in done:
+                future.set_exception(e)
+            return
+        for future, result in done:
+            future.set_result(result)
@@ -0,0 +1,114 @@
+# ==============================
+# Sec｜gyazo_stub.py｜Gyazo アップロードAPIのローカル代替（スループット確認用）
+# ==============================
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class GyazoStub:
+    """
+    /api/upload 相当の POST を受け付けるローカルサーバー。
+    latency 秒かけて応答し、rate_limit 件/秒を超えると 429（Retry-After 付き）、
+    error_rate の割合で 503 を返す。
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.3, rate_limit=5.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.counts = {200: 0, 429: 0, 503: 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = []  # 直近1秒に受け付けた時刻
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/upload"
+
+    def _decide(self):
+        with self._lock:
+            now = time.time()
+            self._window = [t for t in self._window if now - t < 1.0]
+            if self.rate_limit and len(self._window) >= self.rate_limit:
+                status = 429
+            elif self._rng.random() < self.error_rate:
+                status = 503
+            else:
+                status = 200
+                self._window.append(now)
+            self.counts[status] += 1
+            remaining = max(0, int(self.rate_limit) - len(self._window)) if self.rate_limit else 1000
+            return status, self.counts[200], remaining
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(stub.latency)
+                status, serial, remaining = stub._decide()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-RateLimit-Remaining", str(remaining))
+                self.send_header("X-RateLimit-Reset", str(time.time() + 1))
+                if status == 429:
+                    self.send_header("Retry-After", "1")
+                self.end_headers()
+                body = {"url": f"https://gyazo.example/{serial:06d}"} if status == 200 else {"message": "stub"}
+                self.wfile.write(json.dumps(body).encode())
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from pathlib import Path
+    from database import init_db
+    from image_artifact import ImageArtifact
+    from gyazo_uploader import GyazoUploader, UploadPool, UPLOAD_WORKERS
+
+    parser = argparse.ArgumentParser(description="ローカル代替サーバーでアップロードのスループットを測る")
+    parser.add_argument("--count", type=int, default=40, help="送信する画像数")
+    parser.add_argument("--workers", type=int, default=UPLOAD_WORKERS, help="同時送信数")
+    parser.add_argument("--latency", type=float, default=0.3, help="1件あたりの応答時間（秒）")
+    parser.add_argument("--rate-limit", type=float, default=5.0, help="代替サーバーの上限（件/秒）")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="503 を返す割合")
+    args = parser.parse_args()
+
+    # ✅ 一時ディレクトリで実行する（ダミーのハッシュ・URLを本番の result/stock_data.db に残さない）
+    tmp_dir = Path(tempfile.mkdtemp())
+    os.chdir(tmp_dir)
+    init_db()
+    stub = GyazoStub(latency=args.latency, rate_limit=args.rate_limit, error_rate=args.error_rate).start()
+    uploader = GyazoUploader(access_token="stub", upload_url=stub.url, log_path=tmp_dir / "gyazo_stub_log.jsonl")
+
+    # 毎回ハッシュが変わるようにダミー画像の中身に時刻を入れる
+    images = [ImageArtifact(tmp_dir / f"stub_{i}.png", f"stub-{time.time()}-{i}".encode()) for i in range(args.count)]
+    t0 = time.time()
+    with UploadPool(uploader, max_workers=args.workers) as pool:
+        futures = [pool.submit(image) for image in images]
+        urls = [f.result() for f in futures]
+    elapsed = time.time() - t0
+    stub.stop()
+
+    ok = sum(1 for u in urls if u)
+    print(f"📊 {ok}/{args.count}件成功 │ {elapsed:.1f}秒（{ok / elapsed:.2f}件/秒）│ 応答内訳: {stub.counts} │ 最終レート {uploader.bucket.rate:.2f}件/秒")
@@ -5,80 +5,184 @@
 import os
 import time
 import json
-import hashlib
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 from dotenv import load_dotenv
 from datetime import datetime
 
+from image_artifact import ImageArtifact
+from hash_store import init_hash_store, is_uploaded, record_upload  # ✅ 全期間共通のハッシュ索引
+
 today_str = datetime.today().strftime('%Y-%m-%d')      # 既存の日付（例：2025-06-23）
 today_compact = datetime.today().strftime('%Y%m%d')    # 新しい形式（例：20250623）
 
 load_dotenv()
 
 GYAZO_ACCESS_TOKEN = os.getenv("GYAZO_ACCESS_TOKEN")
-UPLOAD_LOG_PATH = Path(f"result/{today_str}/gyazo_uploaded_{today_compact}.json")
+# ✅ ローカルの代替サーバー（gyazo_stub.py）で試すときは環境変数で差し替える
+GYAZO_UPLOAD_URL = os.getenv("GYAZO_UPLOAD_URL", "https://upload.gyazo.com/api/upload")
+UPLOAD_LOG_PATH = Path(f"result/{today_str}/gyazo_uploaded_{today_compact}.jsonl")  # 1件1行の追記
+
+# ✅ 送信レート（トークンバケット）：成功で少しずつ上げ、429/503 で半分に下げる
+UPLOAD_RATE = 1.0        # 初期レート（件/秒）
+UPLOAD_MIN_RATE = 0.05   # 下限（20秒に1件）
+UPLOAD_MAX_RATE = 4.0    # 上限
+UPLOAD_RATE_STEP = 0.1   # 成功1件ごとの増加幅
+UPLOAD_BURST = 3         # 連続で送れる最大件数
+UPLOAD_WORKERS = 4       # 同時に送信中にできる件数
+
+# 429 / 503 でヘッダーに待ち時間が無いときの待機秒数
+THROTTLE_WAIT = {429: 30, 503: 10}
+
+class TokenBucket:
+    """
+    スレッド間で共有する送信レート制御。
+    acquire() でトークンを1つ取り、無ければ補充されるまで待つ。
+    """
+    def __init__(self, rate=UPLOAD_RATE, capacity=UPLOAD_BURST,
+                 min_rate=UPLOAD_MIN_RATE, max_rate=UPLOAD_MAX_RATE, step=UPLOAD_RATE_STEP):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_throttle(self, wait):
+        """
+        429 / 503：レートを半分にし、wait 秒は全スレッドの送信を止める。
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.blocked_until = max(self.blocked_until, now + wait)
+
+    def apply_headers(self, headers):
+        """
+        X-RateLimit-Remaining / X-RateLimit-Reset があれば、リセットまでに使い切らないレートに抑える。
+        """
+        try:
+            remaining = int(headers["X-RateLimit-Remaining"])
+            reset_in = float(headers["X-RateLimit-Reset"]) - time.time()
+        except (KeyError, ValueError, TypeError):
+            return
+        if reset_in <= 0:
+            return
+        with self._lock:
+            if remaining <= 0:
+                self.tokens = 0.0
+                self.blocked_until = max(self.blocked_until, time.monotonic() + reset_in)
+            else:
+                self.rate = max(self.min_rate, min(self.rate, remaining / reset_in))
+
+def retry_after_seconds(headers, default):
+    value = headers.get("Retry-After")
+    if value is None:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
 
 class GyazoUploader:
-    def __init__(self, access_token=GYAZO_ACCESS_TOKEN, log_path=UPLOAD_LOG_PATH):
+    def __init__(self, access_token=GYAZO_ACCESS_TOKEN, log_path=UPLOAD_LOG_PATH,
+                 upload_url=GYAZO_UPLOAD_URL, bucket=None, pool_size=UPLOAD_WORKERS):
         self.access_token = access_token
+        self.upload_url = upload_url
         self.log_path = Path(log_path)
-        self.uploaded_hashes, self.log_data = self._load_log()
-
-    def _load_log(self):
-        if not self.log_path.exists():
-            return set(), []
-        with open(self.log_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return set(entry["hash"] for entry in data), data
-
-    def _save_log(self):
-        with open(self.log_path, "w", encoding="utf-8") as f:
-            json.dump(self.log_data, f, ensure_ascii=False, indent=2)
-
-    def _calculate_hash(self, file_path):
-        with open(file_path, "rb") as f:
-            return hashlib.md5(f.read()).hexdigest()
-
-    def upload(self, image_path, max_retry=3, desc=None):
-        file_path = Path(image_path)
-        if not file_path.exists():
-            print(f"❌ ファイルが存在しません: {file_path}")
-            return None
-
-        image_hash = self._calculate_hash(file_path)
-        if image_hash in self.uploaded_hashes:
+        self.bucket = bucket or TokenBucket()
+        self._log_lock = threading.Lock()
+
+        # ✅ 接続を使い回す（TLSハンドシェイクを毎回しない）
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        init_hash_store()
+
+    def _append_log(self, entry):
+        # 日次ログは記録用（重複判定は hash_store で日をまたいで行う）。1件ずつ追記し、ファイル全体は書き直さない
+        os.makedirs(self.log_path.parent, exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def upload(self, image, max_retry=3, desc=None):
+        """
+        image：ImageArtifact（推奨：ファイルを読み直さない）または画像パス
+        """
+        if not isinstance(image, ImageArtifact):
+            file_path = Path(image)
+            if not file_path.exists():
+                print(f"❌ ファイルが存在しません: {file_path}")
+                return None
+            image = ImageArtifact.from_file(file_path)
+        file_path = Path(image.path)
+        image_hash = image.hash
+        if is_uploaded(image_hash):
             print(f"⏭️ すでにアップロード済み（スキップ）: {file_path.name}")
             return None
 
         for attempt in range(1, max_retry + 1):
+            # ✅ 固定の sleep ではなく共有バケットで送信間隔を調整
+            self.bucket.acquire()
             start_time = time.time()
             try:
-                with open(file_path, "rb") as f:
-                    response = requests.post(
-                        "https://upload.gyazo.com/api/upload",
-                        data={
-                            "access_token": self.access_token,
-                            # ❗ Gyazoはdescを無視するがログには残せる
-                        },
-                        files={"imagedata": f},
-                        timeout=15,
-                    )
+                response = self.session.post(
+                    self.upload_url,
+                    data={
+                        "access_token": self.access_token,
+                        # ❗ Gyazoはdescを無視するがログには残せる
+                    },
+                    files={"imagedata": (file_path.name, image.data, "image/png")},
+                    timeout=15,
+                )
                 duration = time.time() - start_time
+                self.bucket.apply_headers(response.headers)
 
                 if response.status_code == 200:
                     data = response.json()
                     print(f"✅ アップロード成功: {file_path.name}（{duration:.2f}秒）")
+                    self.bucket.on_success()
                     self._record_upload(image_hash, file_path.name, data["url"], desc)
-                    self._save_log()
-                    time.sleep(self._dynamic_sleep(duration))
                     return data["url"]
-                elif response.status_code == 429:
-                    print(f"🚫 レート制限（429）: {file_path.name} → 30秒待機")
-                    time.sleep(30)
-                elif response.status_code == 503:
-                    print(f"⚠️ サーバー過負荷（503）: {file_path.name} → 10秒待機")
-                    time.sleep(10)
+                elif response.status_code in THROTTLE_WAIT:
+                    wait = retry_after_seconds(response.headers, THROTTLE_WAIT[response.status_code])
+                    label = "レート制限" if response.status_code == 429 else "サーバー過負荷"
+                    self.bucket.on_throttle(wait)
+                    print(f"🚫 {label}（{response.status_code}）: {file_path.name} → {wait:.0f}秒待機・送信レート {self.bucket.rate:.2f}件/秒へ")
                 else:
                     print(f"❌ アップロード失敗: {response.status_code} - {response.text}")
                     break
@@ -90,19 +194,36 @@ class GyazoUploader:
         return None
 
     def _record_upload(self, image_hash, file_name, url, desc=None):
-        self.uploaded_hashes.add(image_hash)
-        self.log_data.append({
+        record_upload(image_hash, file_name, url, desc)
+        entry = {
             "hash": image_hash,
             "file_name": file_name,
             "url": url,
             "desc": desc,  # ✅ Gyazoに反映はされないがログには残す
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-        })
-
-    def _dynamic_sleep(self, duration):
-        if duration > 2.5:
-            return 5
-        elif duration > 1.5:
-            return 2
-        return 1
-
+        }
+        with self._log_lock:
+            self._append_log(entry)
+
+class UploadPool:
+    """
+    GyazoUploader.upload を数件並行で実行する。submit は Future を返すので、
+    呼び出し側は結果を待たずに次のチャート描画に進める。
+    """
+    def __init__(self, uploader, max_workers=UPLOAD_WORKERS, stats=None):
+        self.uploader = uploader
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gyazo")
+        # stats（run_stats.RunStats）を渡すと1件ごとの送信時間を "upload" として記録する
+        self._upload = stats.timed("upload", uploader.upload) if stats is not None else uploader.upload
+
+    def submit(self, image, desc=None):
+        return self._executor.submit(self._upload, image, desc=desc)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
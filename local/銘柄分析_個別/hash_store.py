@@ -0,0 +1,170 @@
+# ==============================
+# Sec｜hash_store.py｜チャート画像ハッシュの永続ストア（全年分・SQLite索引）
+# ==============================
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+from database import connection
+
+RESULT_DIR = Path("result")
+
+def init_hash_store():
+    """
+    image_hashes テーブルを作成する。初回（空のとき）は旧JSONログのハッシュを取り込む。
+    """
+    with connection() as conn:
+        # ✅ hash が主キー（B-tree 索引）：全履歴をメモリに載せずに O(log n) で存在確認できる
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            hash TEXT PRIMARY KEY,
+            symbol TEXT,
+            name TEXT,
+            date TEXT,
+            file_name TEXT,
+            url TEXT,
+            desc TEXT,
+            created_at TEXT,
+            uploaded_at TEXT
+        )
+        """)
+        # ✅ 描画キャッシュ（描画内容のキー → 保存済み画像）
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS render_cache (
+            key TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            hash TEXT NOT NULL,
+            created_at TEXT
+        )
+        """)
+        empty = conn.execute("SELECT 1 FROM image_hashes LIMIT 1").fetchone() is None
+    if empty:
+        count = import_legacy_hashes()
+        if count:
+            print(f"🔁 旧ログから画像ハッシュを取り込み: {count}件")
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def has_hash(image_hash):
+    """
+    チャートとして記録済みのハッシュか（アップロード有無は問わない）。
+    """
+    with connection() as conn:
+        return conn.execute(
+            "SELECT 1 FROM image_hashes WHERE hash = ?", (image_hash,)
+        ).fetchone() is not None
+
+def is_uploaded(image_hash):
+    """
+    Gyazo にアップロード済みのハッシュか。
+    """
+    with connection() as conn:
+        return conn.execute(
+            "SELECT 1 FROM image_hashes WHERE hash = ? AND url IS NOT NULL", (image_hash,)
+        ).fetchone() is not None
+
+def get_upload_url(image_hash):
+    with connection() as conn:
+        row = conn.execute(
+            "SELECT url FROM image_hashes WHERE hash = ?", (image_hash,)
+        ).fetchone()
+    return row[0] if row else None
+
+def record_hash(image_hash, symbol=None, name=None, date=None, file_name=None, url=None):
+    """
+    チャート画像のハッシュを記録する（既存なら空いている項目だけ埋める）。
+    """
+    with connection() as conn:
+        conn.execute("""
+            INSERT INTO image_hashes (hash, symbol, name, date, file_name, url, created_at, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET
+                symbol = COALESCE(image_hashes.symbol, excluded.symbol),
+                name = COALESCE(image_hashes.name, excluded.name),
+                date = COALESCE(image_hashes.date, excluded.date),
+                file_name = COALESCE(image_hashes.file_name, excluded.file_name),
+                url = COALESCE(excluded.url, image_hashes.url),
+                uploaded_at = COALESCE(excluded.uploaded_at, image_hashes.uploaded_at)
+        """, (image_hash, symbol, name, date, file_name, url, _now(), _now() if url else None))
+
+def record_upload(image_hash, file_name, url, desc=None):
+    """
+    アップロード成功を記録する（GyazoUploader から呼ぶ）。
+    """
+    with connection() as conn:
+        conn.execute("""
+            INSERT INTO image_hashes (hash, file_name, url, desc, created_at, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET
+                file_name = COALESCE(image_hashes.file_name, excluded.file_name),
+                url = excluded.url,
+                desc = excluded.desc,
+                uploaded_at = excluded.uploaded_at
+        """, (image_hash, file_name, url, desc, _now(), _now()))
+
+def find_render(key):
+    """
+    同じ描画キーの画像が残っていれば (path, hash) を返す。ファイルが消えていれば None。
+    """
+    with connection() as conn:
+        row = conn.execute("SELECT path, hash FROM render_cache WHERE key = ?", (key,)).fetchone()
+    if row is None or not Path(row[0]).exists():
+        return None
+    return row[0], row[1]
+
+def record_render(key, path, image_hash):
+    with connection() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO render_cache (key, path, hash, created_at) VALUES (?, ?, ?, ?)",
+            (key, str(path), image_hash, _now()),
+        )
+
+def import_legacy_hashes(result_dir=RESULT_DIR):
+    """
+    旧ログ（年次・日次のシグナルログ、日次の Gyazo アップロードログ）からハッシュを取り込む。
+    """
+    result_dir = Path(result_dir)
+    rows = []
+
+    def read_entries(path):
+        try:
+            if path.suffix == ".jsonl":
+                with open(path, "r", encoding="utf-8") as f:
+                    return [json.loads(line) for line in f if line.strip()]
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 旧ログ読み込み失敗: {path} - {e}")
+            return []
+
+    for path in sorted(result_dir.glob("**/signal_log_*.json*")):
+        for e in read_entries(path):
+            if e.get("hash"):
+                file_name = Path(e["image_path"]).name if e.get("image_path") else None
+                rows.append((e["hash"], e.get("symbol"), e.get("name"), e.get("date"),
+                             file_name, e.get("gyazo_url"), None, e.get("updated_at"),
+                             e.get("updated_at") if e.get("gyazo_url") else None))
+    for path in sorted(result_dir.glob("**/gyazo_uploaded_*.json*")):
+        for e in read_entries(path):
+            if e.get("hash"):
+                rows.append((e["hash"], None, None, None, e.get("file_name"), e.get("url"),
+                             e.get("desc"), e.get("timestamp"), e.get("timestamp")))
+
+    if not rows:
+        return 0
+    with connection() as conn:
+        conn.executemany("""
+            INSERT INTO image_hashes (hash, symbol, name, date, file_name, url, desc, created_at, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(hash) DO UPDATE SET
+                symbol = COALESCE(image_hashes.symbol, excluded.symbol),
+                name = COALESCE(image_hashes.name, excluded.name),
+                date = COALESCE(image_hashes.date, excluded.date),
+                file_name = COALESCE(image_hashes.file_name, excluded.file_name),
+                url = COALESCE(image_hashes.url, excluded.url),
+                desc = COALESCE(image_hashes.desc, excluded.desc),
+                uploaded_at = COALESCE(image_hashes.uploaded_at, excluded.uploaded_at)
+        """, rows)
+        return conn.execute("SELECT COUNT(*) FROM image_hashes").fetchone()[0]
@@ -0,0 +1,47 @@
+# ==============================
+# Sec｜image_artifact.py｜チャート画像（パス・バイト列・サイズ・ハッシュを1つにまとめる）
+# ==============================
+
+import io
+import os
+import hashlib
+from pathlib import Path
+
+class ImageArtifact:
+    """
+    描画済み画像を1回だけバイト列にし、ハッシュ計算・保存・アップロードで使い回す。
+    ファイルを読み直さずに重複判定（hash）と送信（data）ができる。
+    """
+    def __init__(self, path, data):
+        self.path = str(path)
+        self.data = data
+        self.size = len(data)
+        self.hash = hashlib.md5(data).hexdigest()
+
+    @property
+    def name(self):
+        return Path(self.path).name
+
+    def __fspath__(self):
+        return self.path
+
+    def __str__(self):
+        return self.path
+
+    @classmethod
+    def from_figure(cls, fig, path, **savefig_kwargs):
+        """
+        図をメモリ上の PNG に書き出し、そのバイト列をそのままファイルに保存する。
+        """
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", **savefig_kwargs)
+        artifact = cls(path, buf.getvalue())
+        os.makedirs(Path(path).parent, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(artifact.data)
+        return artifact
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "rb") as f:
+            return cls(path, f.read())
@@ -0,0 +1,490 @@
+# ==============================
+# Sec｜indicators.py｜テクニカル指標の一括計算（NumPy版）
+# ==============================
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from database import load_indicator_state, save_indicator_state, load_indicator_history
+
+# ✅ add_indicators が付与する列（chart_config / analyzer / database で共通）
+INDICATOR_COLS = [
+    "MA5", "MA25", "MA75", "RSI", "MACD", "MACD_signal", "MACD_diff",
+    "BB_High", "BB_Low", "ADX", "STOCH_K", "tenkan", "kijun", "senkou1", "senkou2",
+    "BB_upper", "BB_middle", "BB_lower", "KAIRI_25", "ATR",
+]
+
+# ✅ パラメータ（ta ライブラリの既定値と同じ）
+RSI_WINDOW = 14
+MACD_FAST, MACD_SLOW, MACD_SIGN = 12, 26, 9
+BB_WINDOW, BB_DEV = 20, 2
+ADX_WINDOW = 14
+STOCH_WINDOW = 14
+ATR_WINDOW = 14
+
+# ==========================
+# 基本演算（NaN の扱いは pandas.rolling / ewm と同じ）
+# ==========================
+
+def _rolling(x, window, func):
+    out = np.full(len(x), np.nan)
+    if len(x) >= window:
+        out[window - 1:] = func(sliding_window_view(x, window), axis=1)
+    return out
+
+def rolling_mean(x, window):
+    return _rolling(x, window, np.mean)
+
+def rolling_std(x, window):
+    return _rolling(x, window, np.std)  # ddof=0（BollingerBands と同じ）
+
+def rolling_max(x, window):
+    return _rolling(x, window, np.max)
+
+def rolling_min(x, window):
+    return _rolling(x, window, np.min)
+
+def shift(x, periods):
+    out = np.full(len(x), np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+def ewm(x, alpha, min_periods):
+    """
+    pandas の ewm(alpha=..., adjust=False, min_periods=...).mean() 相当。
+    先頭の NaN は読み飛ばし、最初の有効値から再帰計算を始める。
+    """
+    out = np.full(len(x), np.nan)
+    valid = np.flatnonzero(~np.isnan(x))
+    if len(valid) == 0:
+        return out
+    start = valid[0]
+    values = x.tolist()
+    y = values[start]
+    for i in range(start, len(values)):
+        v = values[i]
+        if v == v:  # NaN でなければ更新
+            y = y + alpha * (v - y) if i > start else y
+        out[i] = y
+    out[start:start + min_periods - 1] = np.nan
+    return out
+
+def ema(x, span):
+    return ewm(x, 2 / (span + 1), span)
+
+def _wilder_sum(first, increments, length, window):
+    """
+    ta の ADX と同じ平滑化：s[0]=first, s[i]=s[i-1]-s[i-1]/window+inc[window+i]（末尾は0のまま）。
+    """
+    out = np.zeros(length)
+    if length == 0:
+        return out
+    out[0] = first
+    inc = increments.tolist()
+    s = first
+    for i in range(1, length - 1):
+        s = s - s / window + inc[window + i]
+        out[i] = s
+    return out
+
+# ==========================
+# 指標
+# ==========================
+
+def rsi(close, window=RSI_WINDOW):
+    diff = np.diff(close, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    emaup = ewm(up, 1 / window, window)
+    emadn = ewm(down, 1 / window, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(emadn == 0, 100.0, 100 - 100 / (1 + emaup / emadn))
+
+def macd(close, fast=MACD_FAST, slow=MACD_SLOW, sign=MACD_SIGN):
+    line = ema(close, fast) - ema(close, slow)
+    signal = ema(line, sign)
+    return line, signal
+
+def true_range(high, low, close):
+    prev = shift(close, 1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    return tr
+
+def atr(high, low, close, window=ATR_WINDOW):
+    tr = true_range(high, low, close).tolist()
+    out = np.zeros(len(tr))
+    if len(tr) < window:
+        return out
+    a = float(np.mean(tr[:window]))
+    out[window - 1] = a
+    for i in range(window, len(tr)):
+        a = (a * (window - 1) + tr[i]) / window
+        out[i] = a
+    return out
+
+def adx(high, low, close, window=ADX_WINDOW):
+    """
+    ta.trend.ADXIndicator(...).adx() と同じ値（先頭の未計算区間は0）。
+    """
+    n = len(close)
+    out = np.zeros(n)
+    length = n - (window - 1)
+    if length <= window:
+        return out
+
+    prev_close = shift(close, 1)
+    tr = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+
+    diff_up = high - shift(high, 1)
+    diff_down = shift(low, 1) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+    pos[0] = neg[0] = np.nan
+
+    trs = _wilder_sum(np.nansum(tr[1:window + 1]), tr, length, window)
+    dip = _wilder_sum(np.nansum(pos[1:window + 1]), pos, length, window)
+    din = _wilder_sum(np.nansum(neg[1:window + 1]), neg, length, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        di_pos = np.where(trs != 0, 100 * dip / trs, 0.0)
+        di_neg = np.where(trs != 0, 100 * din / trs, 0.0)
+        di_sum = di_pos + di_neg
+        dx = np.where(di_sum != 0, 100 * np.abs((di_pos - di_neg) / di_sum), 0.0)
+
+    series = np.zeros(length)
+    a = float(dx[:window].mean())
+    series[window] = a
+    dx_list = dx.tolist()
+    for i in range(window + 1, length):
+        a = (a * (window - 1) + dx_list[i - 1]) / window
+        series[i] = a
+    out[window - 1:] = series
+    return out
+
+def stoch_k(high, low, close, window=STOCH_WINDOW):
+    smin = rolling_min(low, window)
+    smax = rolling_max(high, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 * (close - smin) / (smax - smin)
+
+# ==========================
+# まとめて計算
+# ==========================
+
+def compute_indicators(open_, high, low, close):
+    """
+    OHLC の配列（float64）から INDICATOR_COLS の全列を1回で計算して辞書で返す。
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+
+    out = {}
+    out["MA5"] = rolling_mean(close, 5)
+    out["MA25"] = rolling_mean(close, 25)
+    out["MA75"] = rolling_mean(close, 75)
+    out["RSI"] = rsi(close)
+    out["MACD"], out["MACD_signal"] = macd(close)
+    out["MACD_diff"] = out["MACD"] - out["MACD_signal"]
+
+    # ✅ ボリンジャーバンド（20期間, 2σ）は1回だけ計算して両方の列名に使う
+    bb_mid = rolling_mean(close, BB_WINDOW)
+    bb_std = rolling_std(close, BB_WINDOW)
+    out["BB_High"] = bb_mid + BB_DEV * bb_std
+    out["BB_Low"] = bb_mid - BB_DEV * bb_std
+
+    out["ADX"] = adx(high, low, close)
+    out["STOCH_K"] = stoch_k(high, low, close)
+
+    # ✅ 一目均衡表（雲のみ）
+    out["tenkan"] = (rolling_max(high, 9) + rolling_min(low, 9)) / 2
+    out["kijun"] = (rolling_max(high, 26) + rolling_min(low, 26)) / 2
+    out["senkou1"] = shift((out["tenkan"] + out["kijun"]) / 2, 26)
+    out["senkou2"] = shift((rolling_max(high, 52) + rolling_min(low, 52)) / 2, 26)
+
+    out["BB_upper"] = out["BB_High"]
+    out["BB_middle"] = bb_mid
+    out["BB_lower"] = out["BB_Low"]
+    out["KAIRI_25"] = (close - out["MA25"]) / out["MA25"] * 100
+    out["ATR"] = atr(high, low, close)
+    return out
+
+def add_indicators(df):
+    """
+    df に INDICATOR_COLS の列を付与して返す（既存列は上書き）。
+    """
+    values = compute_indicators(
+        df["Open"].to_numpy(), df["High"].to_numpy(), df["Low"].to_numpy(), df["Close"].to_numpy()
+    )
+    indicators = pd.DataFrame(values, index=df.index, columns=INDICATOR_COLS)
+    df[INDICATOR_COLS] = indicators
+    return df
+
+def has_indicators(df, cols=INDICATOR_COLS):
+    return all(c in df.columns for c in cols)
+
+# ==========================
+# 逐次更新（1日1本追加されたときに O(1) で指標を進める）
+# ==========================
+
+MA_WINDOWS = (5, 25, 75)
+MAX_WINDOW = 75          # 保持する終値の本数（MA75）
+HL_WINDOW = 52           # 保持する高値・安値の本数（一目の先行スパン2）
+SENKOU_SHIFT = 26
+
+def _nan_to_none(values):
+    return [None if v != v else v for v in values]
+
+def _none_to_nan(values):
+    return [np.nan if v is None else v for v in values]
+
+class IncrementalIndicators:
+    """
+    EMA・Wilder平滑化の途中状態と直近の窓（終値75本・高安52本など）だけを保持し、
+    新しい足1本ごとに INDICATOR_COLS の値を計算する。
+    先頭からすべての足を update した結果は compute_indicators と一致する（浮動小数点誤差の範囲）。
+    """
+    def __init__(self):
+        self.count = 0
+        self.prev_close = None
+        self.prev_high = None
+        self.prev_low = None
+        self.closes = []
+        self.highs = []
+        self.lows = []
+        self.mid1 = []     # (転換線+基準線)/2 の直近27本（先行スパン1用）
+        self.mid2 = []     # 52期間の高安中値の直近27本（先行スパン2用）
+        # RSI
+        self.rsi_up = None
+        self.rsi_dn = None
+        # MACD
+        self.ema_fast = None
+        self.ema_slow = None
+        self.macd_sign = None
+        self.macd_count = 0
+        # ATR
+        self.atr = 0.0
+        self.tr_sum = 0.0
+        # ADX
+        self.trs = 0.0
+        self.dip = 0.0
+        self.din = 0.0
+        self.dx_sum = 0.0
+        self.adx = 0.0
+
+    # ---------- 永続化 ----------
+    def to_dict(self):
+        state = dict(self.__dict__)
+        for key in ("closes", "highs", "lows", "mid1", "mid2"):
+            state[key] = _nan_to_none(state[key])
+        return state
+
+    @classmethod
+    def from_dict(cls, state):
+        obj = cls()
+        for key, value in state.items():
+            if key in ("closes", "highs", "lows", "mid1", "mid2"):
+                value = _none_to_nan(value)
+            setattr(obj, key, value)
+        return obj
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        過去の全足を流し込んで状態を作る（初回のみ）。
+        """
+        obj = cls()
+        for o, h, l, c in zip(df["Open"].tolist(), df["High"].tolist(), df["Low"].tolist(), df["Close"].tolist()):
+            obj.update(o, h, l, c)
+        return obj
+
+    # ---------- 窓ヘルパ ----------
+    @staticmethod
+    def _push(buf, value, size):
+        buf.append(value)
+        if len(buf) > size:
+            del buf[0]
+
+    @staticmethod
+    def _window_mean(buf, window):
+        if len(buf) < window:
+            return np.nan
+        return float(np.mean(buf[-window:]))
+
+    @staticmethod
+    def _window_max(buf, window):
+        return float(np.max(buf[-window:])) if len(buf) >= window else np.nan
+
+    @staticmethod
+    def _window_min(buf, window):
+        return float(np.min(buf[-window:])) if len(buf) >= window else np.nan
+
+    # ---------- 1本更新 ----------
+    def update(self, open_, high, low, close):
+        high, low, close = float(high), float(low), float(close)
+        t = self.count
+        prev_close = self.prev_close
+        prev_high = self.prev_high
+        prev_low = self.prev_low
+        self._push(self.closes, close, MAX_WINDOW)
+        self._push(self.highs, high, HL_WINDOW)
+        self._push(self.lows, low, HL_WINDOW)
+
+        out = {}
+        ma = {w: self._window_mean(self.closes, w) for w in MA_WINDOWS}
+        out["MA5"], out["MA25"], out["MA75"] = ma[5], ma[25], ma[75]
+
+        # ✅ RSI（Wilder：alpha=1/14、先頭の差分は0として数える）
+        diff = close - prev_close if prev_close is not None else 0.0
+        up, dn = max(diff, 0.0), max(-diff, 0.0)
+        alpha = 1 / RSI_WINDOW
+        if t == 0:
+            self.rsi_up, self.rsi_dn = up, dn
+        else:
+            self.rsi_up += alpha * (up - self.rsi_up)
+            self.rsi_dn += alpha * (dn - self.rsi_dn)
+        if t + 1 < RSI_WINDOW:
+            out["RSI"] = np.nan
+        elif self.rsi_dn == 0:
+            out["RSI"] = 100.0
+        else:
+            out["RSI"] = 100 - 100 / (1 + self.rsi_up / self.rsi_dn)
+
+        # ✅ MACD（EMA12 - EMA26、シグナルは有効なMACDから EMA9）
+        if t == 0:
+            self.ema_fast = self.ema_slow = close
+        else:
+            self.ema_fast += 2 / (MACD_FAST + 1) * (close - self.ema_fast)
+            self.ema_slow += 2 / (MACD_SLOW + 1) * (close - self.ema_slow)
+        if t + 1 >= MACD_SLOW:
+            line = self.ema_fast - self.ema_slow
+            if self.macd_count == 0:
+                self.macd_sign = line
+            else:
+                self.macd_sign += 2 / (MACD_SIGN + 1) * (line - self.macd_sign)
+            self.macd_count += 1
+            out["MACD"] = line
+            out["MACD_signal"] = self.macd_sign if self.macd_count >= MACD_SIGN else np.nan
+        else:
+            out["MACD"] = out["MACD_signal"] = np.nan
+        out["MACD_diff"] = out["MACD"] - out["MACD_signal"]
+
+        # ✅ ボリンジャーバンド（20期間, 2σ）
+        if len(self.closes) >= BB_WINDOW:
+            window = self.closes[-BB_WINDOW:]
+            mid, std = float(np.mean(window)), float(np.std(window))
+        else:
+            mid = std = np.nan
+        out["BB_High"] = out["BB_upper"] = mid + BB_DEV * std
+        out["BB_Low"] = out["BB_lower"] = mid - BB_DEV * std
+        out["BB_middle"] = mid
+
+        # ✅ ADX（ta と同じく14本目から平滑化、28本目で初期値＝DX14本の平均）
+        if t >= 1:
+            tr = max(high, prev_close) - min(low, prev_close)
+            diff_up, diff_down = high - prev_high, prev_low - low
+            pos = diff_up if (diff_up > diff_down and diff_up > 0) else 0.0
+            neg = diff_down if (diff_down > diff_up and diff_down > 0) else 0.0
+            if t <= ADX_WINDOW:
+                self.trs += tr
+                self.dip += pos
+                self.din += neg
+            else:
+                self.trs += tr - self.trs / ADX_WINDOW
+                self.dip += pos - self.dip / ADX_WINDOW
+                self.din += neg - self.din / ADX_WINDOW
+        if t >= ADX_WINDOW:
+            di_pos = 100 * self.dip / self.trs if self.trs != 0 else 0.0
+            di_neg = 100 * self.din / self.trs if self.trs != 0 else 0.0
+            di_sum = di_pos + di_neg
+            dx = 100 * abs((di_pos - di_neg) / di_sum) if di_sum != 0 else 0.0
+            if t < 2 * ADX_WINDOW - 1:
+                self.dx_sum += dx
+            elif t == 2 * ADX_WINDOW - 1:
+                self.adx = (self.dx_sum + dx) / ADX_WINDOW
+            else:
+                self.adx = (self.adx * (ADX_WINDOW - 1) + dx) / ADX_WINDOW
+        out["ADX"] = self.adx
+
+        # ✅ ストキャスティクス（%K）
+        smin = self._window_min(self.lows, STOCH_WINDOW)
+        smax = self._window_max(self.highs, STOCH_WINDOW)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["STOCH_K"] = float(np.float64(100) * (close - smin) / (smax - smin))
+
+        # ✅ 一目均衡表（雲のみ）
+        out["tenkan"] = (self._window_max(self.highs, 9) + self._window_min(self.lows, 9)) / 2
+        out["kijun"] = (self._window_max(self.highs, 26) + self._window_min(self.lows, 26)) / 2
+        self._push(self.mid1, (out["tenkan"] + out["kijun"]) / 2, SENKOU_SHIFT + 1)
+        self._push(self.mid2, (self._window_max(self.highs, 52) + self._window_min(self.lows, 52)) / 2, SENKOU_SHIFT + 1)
+        out["senkou1"] = self.mid1[0] if len(self.mid1) > SENKOU_SHIFT else np.nan
+        out["senkou2"] = self.mid2[0] if len(self.mid2) > SENKOU_SHIFT else np.nan
+
+        out["KAIRI_25"] = (close - out["MA25"]) / out["MA25"] * 100
+
+        # ✅ ATR（14本目＝TR14本の平均、以降 Wilder 平滑化）
+        tr_atr = high - low if prev_close is None else max(high - low, abs(high - prev_close), abs(low - prev_close))
+        if t < ATR_WINDOW - 1:
+            self.tr_sum += tr_atr
+        elif t == ATR_WINDOW - 1:
+            self.atr = (self.tr_sum + tr_atr) / ATR_WINDOW
+        else:
+            self.atr = (self.atr * (ATR_WINDOW - 1) + tr_atr) / ATR_WINDOW
+        out["ATR"] = self.atr
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.count += 1
+        return out
+
+def _state_matches(state, bar):
+    """
+    状態の最終足（prev_close / prev_high / prev_low）が df の同じ日の足と一致するか。
+    当日途中の足が確定した・分割調整で再取得した、などで足が変わっていれば使えない。
+    """
+    return (state.get("prev_close"), state.get("prev_high"), state.get("prev_low")) == \
+        (float(bar["Close"]), float(bar["High"]), float(bar["Low"]))
+
+def advance_indicators(symbol, df, writer=None):
+    """
+    df に INDICATOR_COLS の列を付与して返す（add_indicators と同じ形）。
+    保存済みの状態が df の足と一致すれば、それより新しい足だけを update で計算し、
+    それ以前の足は price_history に保存済みの指標を使う。
+    状態が無い・足が一致しない・保存済みの指標が欠けている場合は add_indicators で全期間を計算し直す。
+    状態は最新足まで進めて保存する。writer（database.DBWriter）を渡すと保存は書き込みスレッドに任せる。
+    """
+    dates = df.index.strftime("%Y-%m-%d")
+    state_date, state = load_indicator_state(symbol)
+
+    history = None
+    if state is not None and state_date in dates:
+        pos = dates.get_loc(state_date)
+        if _state_matches(state, df.iloc[pos]):
+            history = load_indicator_history(symbol, dates[0], state_date)
+            if not history.index.equals(df.index[:pos + 1]):
+                history = None  # 途中の足の指標が保存されていない
+
+    if history is None:
+        df = add_indicators(df)
+        calc = IncrementalIndicators.from_frame(df)
+        changed = True
+    else:
+        calc = IncrementalIndicators.from_dict(state)
+        new_rows = df.iloc[pos + 1:]
+        rows = [calc.update(o, h, l, c) for o, h, l, c in zip(
+            new_rows["Open"].tolist(), new_rows["High"].tolist(), new_rows["Low"].tolist(), new_rows["Close"].tolist())]
+        # price_history に無い列（BB_High/BB_Low は BB_upper/BB_lower と同じ値、転換線・基準線は高安から）
+        high, low = df["High"].to_numpy(dtype=np.float64), df["Low"].to_numpy(dtype=np.float64)
+        history["BB_High"], history["BB_Low"] = history["BB_upper"], history["BB_lower"]
+        history["tenkan"] = ((rolling_max(high, 9) + rolling_min(low, 9)) / 2)[:pos + 1]
+        history["kijun"] = ((rolling_max(high, 26) + rolling_min(low, 26)) / 2)[:pos + 1]
+        values = pd.concat([history, pd.DataFrame(rows, index=new_rows.index)]) if rows else history
+        df[INDICATOR_COLS] = values[INDICATOR_COLS]
+        changed = bool(rows)
+
+    if changed:
+        if writer is not None:
+            writer.save_indicator_state(symbol, dates[-1], calc.to_dict())
+        else:
+            save_indicator_state(symbol, dates[-1], calc.to_dict())
+    return df
@@ -4,10 +4,10 @@
 
 # 標準ライブラリ
 import os
+import sys
 import json
 import csv
 import time
-import hashlib
 import argparse
 from datetime import datetime
 
@@ -17,12 +17,24 @@ import pandas as pd
 from dotenv import load_dotenv  # ✅ .envから環境変数を読み込み
 
 # 自作モジュール（プロジェクト内）
-from setup import JP_FONT
+from setup import JP_FONT, use_shared_modules
+use_shared_modules()  # ✅ 銘柄分析_初動 の共用モジュール（trace_events / symbol_master）を import できるようにする
 from stock_data import get_symbols_from_excel, fetch_stock_data
-from chart_config import add_indicators, plot_chart
-from gyazo_uploader import GyazoUploader
+from trace_events import TraceRecorder, NULL_TRACER  # ✅ 処理区間のトレース（銘柄分析_初動 と共用）
+from chart_config import chart_content_key
+from image_artifact import ImageArtifact
+from chart_renderer import ChartRenderPool, RENDER_WORKERS as DEFAULT_RENDER_WORKERS  # ✅ 描画はプロセスプールで
+from pipeline import Pipeline, Stage, SkipItem  # ✅ 段ごとに並列数を決めたパイプライン
+from gyazo_uploader import GyazoUploader, UploadPool  # ✅ 並行アップロード
 from slack_notifier import notify_signal_alerts_from_uploaded  # ✅ Slack通知
-from database import load_latest_data, init_db, save_price_data  # ✅ SQLite対応
+from database import load_latest_data, init_db, DBWriter, write_price_data  # ✅ SQLite対応（書き込みは専用スレッド）
+from indicators import advance_indicators  # ✅ 指標の逐次更新（前回の状態から新しい足だけ計算）
+from panel import IndicatorPanel  # ✅ 全銘柄一括の指標計算
+from signal_log import SignalLog  # ✅ シグナルログ（追記専用）
+from hash_store import init_hash_store, has_hash, record_hash, get_upload_url, find_render, record_render  # ✅ 画像ハッシュ（全年分）
+from upload_queue import init_upload_queue, enqueue_upload, mark_uploaded, mark_failed, drain_upload_queue, count_pending  # ✅ アップロード待ちキュー
+from run_manifest import init_run_manifest, RunManifest, RUN_STAGES, write_run_stage  # ✅ 途中再開用の実行記録
+from run_stats import RunStats, EwmaEta  # ✅ 段ごとの処理時間・残り時間
 from analyzer import analyze_stock, classify_signals, detect_signals  # ✅ 分析・シグナル検出
 
 # ==============================
@@ -36,19 +48,25 @@ plt.rcParams["font.family"] = JP_FONT
 load_dotenv()
 GYAZO_ACCESS_TOKEN = os.getenv("GYAZO_ACCESS_TOKEN")
 
-# ✅ SQLite データベース初期化
-init_db()
-
 # ==============================
 # 引数設定（コマンドライン用）
 # ==============================
 
-parser = argparse.ArgumentParser(description="株価チャート自動処理")
-parser.add_argument("--upload", action="store_true", help="Gyazoアップロードを有効にする")
-parser.add_argument("--slack", action="store_true", help="Slack通知を有効にする")
-args = parser.parse_args()
-ENABLE_GYAZO_UPLOAD = args.upload
-ENABLE_SLACK = args.slack
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="株価チャート自動処理")
+    parser.add_argument("--upload", action="store_true", help="Gyazoアップロードを有効にする")
+    parser.add_argument("--slack", action="store_true", help="Slack通知を有効にする")
+    parser.add_argument("--full-fetch", action="store_true", help="DB保存済みの足を使わず全期間を再取得する")
+    parser.add_argument("--panel", action="store_true", help="全銘柄を先に取得し、指標を日付×銘柄の行列で一括計算する")
+    parser.add_argument("--fetch-workers", type=int, default=4, help="株価取得（通信）の同時実行数")
+    parser.add_argument("--analyze-workers", type=int, default=2, help="指標計算・分析の同時実行数")
+    parser.add_argument("--render-workers", type=int, default=DEFAULT_RENDER_WORKERS,
+                        help="チャート描画のプロセス数（0 でメインプロセス内で描画）")
+    parser.add_argument("--resume", action="store_true", help="同じ日の中断した実行を、各銘柄の未完了の段から再開する")
+    parser.add_argument("--trace", nargs="?", const="", metavar="JSON_PATH",
+                        help="段×銘柄ごとの処理区間を Chrome trace 形式で書き出す（chrome://tracing / Perfetto で表示）")
+    parser.add_argument("--drain-uploads", action="store_true", help="描画せず、アップロード待ちキューの送信だけ行う")
+    return parser.parse_args(argv)
 
 # ==============================
 # 日付ベースの保存パス
@@ -60,8 +78,25 @@ today_compact = datetime.today().strftime('%Y%m%d')    # 新しい形式（例
 #LOG_PATH_ALL = "result/gyazo_log.json"
 LOG_PATH_ALL = f"result/signal_log_{datetime.today().year}.json" # 年ごとにログを分ける
 LOG_PATH_DAILY = f"result/{today_str}/signal_log_{today_compact}.json"
-os.makedirs(os.path.dirname(LOG_PATH_ALL), exist_ok=True)
-os.makedirs(os.path.dirname(LOG_PATH_DAILY), exist_ok=True)
+# ✅ 実体は追記専用の JSONL（上の JSON は export_json で書き出す旧形式）
+LOG_STORE_ALL = f"result/signal_log_{datetime.today().year}.jsonl"
+LOG_STORE_DAILY = f"result/{today_str}/signal_log_{today_compact}.jsonl"
+
+def signal_log_paths(day):
+    """
+    指定日（'YYYY-MM-DD'）の (年次JSONL, 年次JSON, 日次JSONL, 日次JSON) のパス。
+    """
+    compact = day.replace("-", "")
+    return (f"result/signal_log_{day[:4]}.jsonl", f"result/signal_log_{day[:4]}.json",
+            f"result/{day}/signal_log_{compact}.jsonl", f"result/{day}/signal_log_{compact}.json")
+# 段ごとの処理時間の JSON レポート（日次フォルダに1日1ファイル）
+RUN_REPORT_PATH = f"result/{today_str}/run_report_{today_compact}.json"
+TRACE_PATH = f"result/{today_str}/trace_{today_compact}.json"  # --trace でパスを省略したときの出力先
+# dedup はハッシュ索引（has_hash / record_hash）の DB 照会・登録の時間（md5 の計算は描画プロセス側）
+TIMED_STAGES = ("fetch", "indicators", "analysis", "render", "dedup", "upload", "db")
+
+# 再開用に取得済みの株価を置く場所（銘柄の記録が終わったら消す）
+CHECKPOINT_DIR = f"result/{today_str}/checkpoint"
 
 csv_filename = f"signal_chart_uploaded_{today_compact}.csv"  # today_str = 2025-06-23
 
@@ -69,39 +104,17 @@ csv_filename = f"signal_chart_uploaded_{today_compact}.csv"  # today_str = 2025-
 # 補助関数群
 # ==============================
 
-def load_uploaded_hashes_json(log_path):
-    if not os.path.exists(log_path):
-        return set(), []
-    with open(log_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-        return set(entry["hash"] for entry in data), data
-
-def append_upload_log_json(log_path, log_data, new_entry):
+def init_storage():
     """
-    同一の symbol, date, name を持つエントリが存在する場合は、古いものを削除して新しいエントリを追加。
+    SQLite のテーブルと保存先フォルダを用意する。
+    ※ import 時には実行しない（spawn の描画プロセスは main.py を読み直すため）。
     """
-    # 一意な識別キー（symbol + date + name）で重複判定
-    unique_key = (new_entry["symbol"], new_entry["date"], new_entry["name"])
-    # 重複エントリを削除（破壊的変更）
-    log_data[:] = [
-        e for e in log_data
-        if (e.get("symbol"), e.get("date"), e.get("name")) != unique_key
-    ]
-    # 更新日時も記録（任意）
-    from datetime import datetime
-    new_entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
-    # 新しいエントリを追加
-    log_data.append(new_entry)
-    # JSONファイルに書き込み
-    with open(log_path, 'w', encoding='utf-8') as f:
-        json.dump(log_data, f, ensure_ascii=False, indent=2)
-
-def get_file_md5(file_path):
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+    init_db()
+    init_hash_store()
+    init_upload_queue()
+    init_run_manifest()
+    os.makedirs(os.path.dirname(LOG_PATH_ALL), exist_ok=True)
+    os.makedirs(os.path.dirname(LOG_PATH_DAILY), exist_ok=True)
 
 def write_gyazo_csv(csv_path, entries):
     file_exists = os.path.exists(csv_path)
@@ -122,14 +135,92 @@ def write_gyazo_csv(csv_path, entries):
 # メイン処理
 # ==============================
 
-def main():
+def log_db_result(symbol, future):
+    try:
+        result = future.result()
+    except Exception as e:
+        print(f"❌ DB登録失敗: ({symbol}) - {e}")
+        return
+    if result["status"] == "inserted":
+        print(f"🗃️ DB登録: {result['count']}件 ({symbol})")
+    else:
+        print(f"🗃️ DB登録スキップ: ({symbol})（すでに登録済）")
+
+def apply_upload_url(entry, url, signal_logs):
+    entry["gyazo_url"] = url
+    # 同じ (symbol, date, name) で追記すると URL 付きのエントリに置き換わる
+    for log in signal_logs:
+        log.append(entry)
+    record_hash(entry["hash"], url=url)
+
+def finish_uploads(pending, signal_logs, wait=False):
+    """
+    完了したアップロードの URL をシグナルログ・ハッシュストア・キューに反映し、未完了分を返す。
+    wait=True ならすべて完了するまで待つ。
+    """
+    remaining = []
+    for future, entry in pending:
+        if not wait and not future.done():
+            remaining.append((future, entry))
+            continue
+        try:
+            # アップロード済みでスキップされた場合は記録済みの URL を使う
+            url = future.result() or get_upload_url(entry["hash"])
+        except Exception as e:
+            print(f"❌ Gyazoアップロード失敗: {entry['symbol']} - {e}")
+            url = None
+        print(f"✅ Gyazoアップロード: {entry['symbol']} {url or '❌'}")
+        if url:
+            mark_uploaded(entry["hash"], url)
+            apply_upload_url(entry, url, signal_logs)
+        else:
+            # キューに残るので --drain-uploads で再送できる
+            mark_failed(entry["hash"], "アップロード失敗")
+    return remaining
+
+def drain_uploads_only():
+    """
+    --drain-uploads：描画はせず、前回までに積まれたアップロード待ちだけを送信してログに反映する。
+    """
+    uploader = GyazoUploader()
+    logs = {}
+    daily_exports = {}
+
+    def on_uploaded(item, url):
+        store_all, json_all, store_daily, json_daily = signal_log_paths(item["date"] or today_str)
+        for store, legacy in ((store_all, json_all), (store_daily, json_daily)):
+            if store not in logs:
+                logs[store] = SignalLog(store, legacy_json=legacy)
+        daily_exports[json_daily] = logs[store_daily]
+
+        entry = logs[store_daily].get(item["symbol"], item["date"], item["name"]) \
+            or logs[store_all].get(item["symbol"], item["date"], item["name"])
+        if entry is not None:
+            apply_upload_url(dict(entry), url, [logs[store_all], logs[store_daily]])
+        else:
+            record_hash(item["hash"], url=url)
+
+    counts = drain_upload_queue(uploader, on_uploaded=on_uploaded)
+    for json_path, log in daily_exports.items():
+        log.export_json(json_path)
+    print(f"✅ キュー送信完了: 成功 {counts['done']}件／失敗 {counts['failed']}件（残り {count_pending()}件）")
+
+def main(args=None):
+    if args is None:
+        args = parse_args()
+    init_storage()
+    trace_enabled = args.trace is not None
     uploader = GyazoUploader()  # ← 追加！
     symbols = get_symbols_from_excel()
     total = len(symbols)
-    uploaded_hashes, log_data_all = load_uploaded_hashes_json(LOG_PATH_ALL)
-    _, log_data_daily = load_uploaded_hashes_json(LOG_PATH_DAILY)
+    signal_log_all = SignalLog(LOG_STORE_ALL, legacy_json=LOG_PATH_ALL)
+    signal_log_daily = SignalLog(LOG_STORE_DAILY, legacy_json=LOG_PATH_DAILY)
     uploaded_today = []
 
+    pending_count = count_pending()
+    if pending_count:
+        print(f"📤 前回までのアップロード待ち: {pending_count}件（--drain-uploads で送信できます）")
+
     if total == 0:
         print("❌ 処理対象の銘柄がありません")
         return
@@ -138,98 +229,254 @@ def main():
     print("━━━━━━━━━━━━━━━━━━━━")
 
     start_time = time.time()
-
-    for idx, symbol in enumerate(symbols, 1):
-        t0 = time.time()
-
-        try:
-            df, name = fetch_stock_data(symbol)
-            if df is None or df.empty:
-                raise ValueError("データ取得失敗 or 空データ")
-
-            df = add_indicators(df)
-            #save_price_data(df, symbol, name) # ✅ SQLiteへの保存   
-
-            # 1銘柄ずつ処理するループ内（例: for symbol in symbols ...）
-            signals, comment, _, attention, _, _ = analyze_stock(df)
-            signal_dict = classify_signals(signals)  # ← 分類する！
-
-            # ✅ チャート出力（必要に応じて comment を渡す設計に変更）
-            image_path, signals, signal_comment = plot_chart(df, symbol, name)
-            image_hash = get_file_md5(image_path)
-
-            # ✅ アップロード済みの場合はスキップ
-            if image_hash in uploaded_hashes:
-                elapsed = time.time() - t0
-                remaining = elapsed * (total - idx)
-                mins, secs = divmod(int(remaining), 60)
-
-                print(f"\n▶ 処理中: {symbol} │ {idx}/{total}件中／残り: {mins}分{secs}秒")
-                print(f"📈 チャート画像: {image_path}")
-
-                # Gyazoアップロードスキップ理由を明示
-                if ENABLE_GYAZO_UPLOAD:
-                    print("⏭ Gyazoアップロード：スキップ（すでにアップロード済み）")
-                else:
-                    print("🚫 Gyazoスキップ（--upload未指定）")
-
-                # DB登録スキップ理由
-                print("🗃️ DB登録: スキップ（アップロード済）")
-
-                continue  # スキップして次の銘柄へ
-
-            # ✅ 新規アップロード（堅牢版）
-            gyazo_url = None
-            if ENABLE_GYAZO_UPLOAD:
-                desc = f"{symbol} {name} の株価チャート（{today_str}）"
-                gyazo_url = uploader.upload(image_path, desc=desc)
-
-            # ✅ ログ追記
-            new_entry = {
-                "symbol": symbol,
-                "name": name,
-                "date": today_str,
-                "updated_at":datetime.now().isoformat(timespec="seconds"),
-                "image_path": image_path,
-                "gyazo_url": gyazo_url,
-                "hash": image_hash,
-                "attention": attention,
-                "comment": comment,
-                "signals": signal_dict  # ← 分類された形で保存！
-            }
-            append_upload_log_json(LOG_PATH_ALL, log_data_all, new_entry)
-            append_upload_log_json(LOG_PATH_DAILY, log_data_daily, new_entry)
-            uploaded_today.append(new_entry)
-
-            # ✅ 進捗表示
-            elapsed = time.time() - t0
-            remaining = elapsed * (total - idx)
-            mins, secs = divmod(int(remaining), 60)
-
-            # ▶ 進捗ヘッダー
-            print(f"\n▶ 処理中: {symbol} │ {idx}/{total}件中／残り: {mins}分{secs}秒")
-            # 📈 チャート出力ログ（重複除去）
+    # ✅ --trace 指定時だけ記録する（未指定なら何もしない空のトレーサー）
+    tracer = TraceRecorder("個別") if trace_enabled else NULL_TRACER
+    run_stats = RunStats(TIMED_STAGES, tracer=tracer if trace_enabled else None)  # ✅ 段ごとの処理時間
+    # ✅ 描画プロセスを先に起動し、初回描画までにフォント・ひな形の準備を済ませておく
+    render_pool = ChartRenderPool(args.render_workers, tracer=tracer)
+    db_writer = DBWriter().start()
+    upload_pool = UploadPool(uploader, stats=run_stats) if args.upload else None
+    pending_uploads = []
+
+    # ✅ 実行記録（--resume なら完了済みの銘柄・段を飛ばす）
+    manifest = RunManifest(today_str, CHECKPOINT_DIR)
+    if args.resume:
+        counts = manifest.counts(symbols)
+        print(f"🔁 再開: 完了済み {counts.get('done', 0)}銘柄をスキップ／"
+              + "・".join(f"{stage}から {counts[stage]}銘柄" for stage in RUN_STAGES if stage in counts))
+    else:
+        manifest.reset()
+    run_symbols = [symbol for symbol in symbols if manifest.next_stage(symbol)]
+    total = len(run_symbols)
+    eta = EwmaEta(total)
+
+    def fetch_frame(symbol):
+        """
+        株価を取得して保存しておく（再開時は保存済みの株価を使い、通信しない）。
+        """
+        if args.resume and "fetch" in manifest.completed(symbol):
+            df, name = manifest.load_frame(symbol)
+            if df is not None:
+                return df, name
+        with run_stats.measure("fetch"):
+            df, name = fetch_stock_data(symbol, incremental=not args.full_fetch)
+        if df is not None and not df.empty:
+            manifest.save_frame(symbol, df, name)
+            manifest.mark(symbol, "fetch")
+        return df, name
+
+    # ✅ パネルモード：先に全銘柄を取得し、指標を日付×銘柄の行列でまとめて計算
+    panel = None
+    panel_names = {}
+    if args.panel:
+        frames = {}
+        for symbol in run_symbols:
+            frames[symbol], panel_names[symbol] = fetch_frame(symbol)
+        panel = IndicatorPanel(frames)
+        print(f"🧮 パネル指標計算: {len(panel.symbols)}銘柄（{time.time() - start_time:.1f}秒）")
+
+    # ==============================
+    # 段ごとの処理（取得 → 指標・分析 → 描画 → 記録）
+    # ==============================
+
+    def fetch_stage(job):
+        symbol = job["symbol"]
+        if panel is not None:
+            if symbol not in panel:
+                raise SkipItem("データ取得失敗 or 空データ")
+            job["df"], job["name"] = panel.frame(symbol), panel_names[symbol]
+            return job
+        df, name = fetch_frame(symbol)
+        if df is None or df.empty:
+            raise SkipItem("データ取得失敗 or 空データ")
+        job["df"], job["name"] = df, name
+        return job
+
+    def analyze_stage(job):
+        symbol, name = job["symbol"], job["name"]
+        if panel is None:
+            with run_stats.measure("indicators"):
+                job["df"] = advance_indicators(symbol, job["df"], writer=db_writer)
+        df = job["df"]
+
+        analyzed = manifest.data(symbol, "analyze") if args.resume else None
+        if analyzed is None:
+            with run_stats.measure("analysis"):
+                signals, comment, _, attention, _, _ = analyze_stock(df)
+                analyzed = {
+                    "signals": classify_signals(signals),  # ← 分類する！
+                    "comment": comment,
+                    "attention": attention,
+                    "render_key": chart_content_key(df, symbol, name),
+                }
+            manifest.mark(symbol, "analyze", analyzed)
+        job.update(analyzed)
+
+        # ✅ 描画前に内容キーで判定し、同じ内容の画像があれば描画しない（休日・再実行時・再開時）
+        job["image"] = find_render(job["render_key"])
+        job["cached"] = job["image"] is not None
+        return job
+
+    def render_stage(job):
+        # 描画は別プロセス。このスレッドは結果を待つだけなので、並列数＝描画プロセス数
+        if not job["cached"]:
+            with run_stats.measure("render"):
+                path, image_hash, data = render_pool.submit(job["df"], job["symbol"], job["name"]).result()
+            job["image"] = (path, image_hash)
+            job["artifact"] = ImageArtifact(path, data)  # 描画プロセスから受け取ったバイト列をそのまま送信に使う
+            record_render(job["render_key"], path, image_hash)
+        manifest.mark(job["symbol"], "render", list(job["image"]))
+        return job
+
+    def record_stage(job):
+        """
+        描画が終わった銘柄の後処理：重複判定 → ログ追記 → アップロード投入 → DB登録（1スレッドで順に）。
+        """
+        nonlocal pending_uploads
+        symbol, name, df = job["symbol"], job["name"], job["df"]
+        image_path, image_hash = job["image"]
+
+        # ✅ 進捗（完了間隔の指数移動平均から残り時間を見積もる）
+        finished = pipeline.finished + 1
+        mins, secs = divmod(int(eta.update(finished)), 60)
+
+        # ✅ 再開時：前回この段の途中で止まった銘柄は、ログ追記済みでもキュー・ハッシュ登録・送信・DB 登録をやり直す
+        logged_today = args.resume and "render" in job["resumed"] and \
+            signal_log_daily.get(symbol, today_str, name) is not None
+
+        # ✅ アップロード済みの場合はスキップ
+        with run_stats.measure("dedup"):
+            known = has_hash(image_hash)
+        if known and not logged_today:
+            print(f"\n▶ 処理中: {symbol} │ {finished}/{total}件中／残り: {mins}分{secs}秒")
             print(f"📈 チャート画像: {image_path}")
-            # 🚫 Gyazo通知
-            if ENABLE_GYAZO_UPLOAD:
-                print(f"✅ Gyazoアップロード: {gyazo_url or '❌'}")
+
+            # Gyazoアップロードスキップ理由を明示
+            if args.upload:
+                print("⏭ Gyazoアップロード：スキップ（すでにアップロード済み）")
             else:
                 print("🚫 Gyazoスキップ（--upload未指定）")
-            # 🗃️ DB登録ログ（仮に件数を決め打ちしていたらそのまま）
-            result = save_price_data(df, symbol, name)
-            if result["status"] == "inserted":
-                print(f"🗃️ DB登録: {result['count']}件 ({symbol})")
-            else:
-                print(f"🗃️ DB登録スキップ: ({symbol})（すでに登録済）")
-
-        except Exception as e:
-            print(f"\n❌ エラー発生: {symbol} - {e}")
 
+            # DB登録スキップ理由
+            print("🗃️ DB登録: スキップ（アップロード済）")
+            manifest.mark(symbol, "record")
+            manifest.drop_frame(symbol)
+            return None
+
+        # ✅ 新規アップロード（URL は完了後に finish_uploads でログへ反映）
+        gyazo_url = None
+
+        # ✅ ログ追記
+        new_entry = {
+            "symbol": symbol,
+            "name": name,
+            "date": today_str,
+            "updated_at":datetime.now().isoformat(timespec="seconds"),
+            "image_path": image_path,
+            "gyazo_url": gyazo_url,
+            "hash": image_hash,
+            "attention": job["attention"],
+            "comment": job["comment"],
+            "signals": job["signals"]  # ← 分類された形で保存！
+        }
+        artifact = None
+        desc = f"{symbol} {name} の株価チャート（{today_str}）"
+        if upload_pool is not None:
+            # 今回描画した画像は描画プロセスから受け取ったバイト列を使う（描画を省いた・再開した銘柄だけファイルから読む）
+            artifact = job.get("artifact") or ImageArtifact.from_file(image_path)
+            # ログ追記より先にキューへ記録（途中で落ちても --drain-uploads で再描画なしに送信できる。積み済みなら何もしない）
+            enqueue_upload(artifact, symbol=symbol, name=name, date=today_str, desc=desc)
+
+        if logged_today:
+            # 前回この段の途中で止まった：ログは追記済みなので、そのエントリに URL を反映する
+            new_entry = signal_log_daily.get(symbol, today_str, name)
+        else:
+            signal_log_all.append(new_entry)
+            signal_log_daily.append(new_entry)
+        # ✅ ハッシュ登録・送信は再開時もやり直す（登録は空き項目を埋めるだけ、送信済みのハッシュは uploader がスキップ）
+        with run_stats.measure("dedup"):
+            record_hash(image_hash, symbol=symbol, name=name, date=today_str,
+                        file_name=os.path.basename(image_path), url=gyazo_url)
+        uploaded_today.append(new_entry)
+        if upload_pool is not None:
+            pending_uploads.append((upload_pool.submit(artifact, desc=desc), new_entry))
+
+        # ▶ 進捗ヘッダー
+        print(f"\n▶ 処理中: {symbol} │ {finished}/{total}件中／残り: {mins}分{secs}秒")
+        # 📈 チャート出力ログ（重複除去）
+        print(f"📈 チャート画像: {image_path}")
+        # 🚫 Gyazo通知
+        if args.upload:
+            print(f"📤 Gyazoアップロード: 送信待ち（{len(pending_uploads)}件）")
+        else:
+            print("🚫 Gyazoスキップ（--upload未指定）")
+        pending_uploads = finish_uploads(pending_uploads, [signal_log_all, signal_log_daily])
+        # 🗃️ DB登録（書き込みスレッドに積むだけ。結果はコミット後にログ出力）
+        future = db_writer.submit(run_stats.timed("db", lambda conn: write_price_data(conn, [(df, symbol, name)])[symbol]))
+        future.add_done_callback(lambda f, symbol=symbol: log_db_result(symbol, f))
+        # ✅ 完了の記録は DB 登録と同じ書き込みスレッドに積む（コミットされて初めて完了扱い）
+        db_writer.submit(write_run_stage, today_str, symbol, "record")
+        manifest.drop_frame(symbol)
+        return None
+
+    def on_skip(symbol, stage, reason):
+        print(f"\n⏭ スキップ: {symbol} - {reason}")
+
+    def on_error(symbol, stage, error):
+        # ✅ 1銘柄の失敗はその銘柄だけで止め、他の銘柄は流し続ける
+        print(f"\n❌ エラー発生: {symbol}（{stage}）- {type(error).__name__}: {error}")
+
+    pipeline = Pipeline([
+        Stage("fetch", fetch_stage, workers=1 if panel is not None else args.fetch_workers),
+        Stage("analyze", analyze_stage, workers=args.analyze_workers),
+        Stage("render", render_stage, workers=max(1, args.render_workers)),
+        Stage("record", record_stage, workers=1),
+    ], key=lambda job: job["symbol"], on_error=on_error, on_skip=on_skip,
+        tracer=tracer if trace_enabled else None)
+    pipeline.run({"symbol": symbol, "resumed": manifest.completed(symbol)} for symbol in run_symbols)
+    render_pool.shutdown()
+    print("━━━━━━━━━━━━━━━━━━━━")
+    print("⏱ 段ごとの処理時間（実質秒数が最大の段が全体の所要時間を決める）")
+    print(pipeline.summary())
+    if pipeline.errors:
+        print(f"❌ 失敗 {len(pipeline.errors)}銘柄: " + "、".join(f"{sym}（{stage}）" for sym, stage, _ in pipeline.errors))
+
+    # ✅ 送信中のアップロードと積み残しの書き込みをすべて終えてから終了
+    pending_uploads = finish_uploads(pending_uploads, [signal_log_all, signal_log_daily], wait=True)
+    if upload_pool is not None:
+        upload_pool.shutdown()
+    db_writer.close()
+
+    # ✅ 日次ログは旧形式の JSON にも書き出す（CSV出力・Slack通知が読む）
+    signal_log_daily.export_json(LOG_PATH_DAILY)
+    if signal_log_all.compact_if_needed():
+        print(f"🧹 シグナルログを詰め直しました: {LOG_STORE_ALL}")
     print("✅ 全銘柄処理完了（所要時間: {:.1f}秒）".format(time.time() - start_time))
+
+    # ✅ 段ごとの処理時間（p50/p95）と、日ごとに比較できる JSON レポート
+    print("⏱ 1件あたりの処理時間（秒）")
+    print(run_stats.format_table())
+    run_stats.write_report(
+        RUN_REPORT_PATH, date=today_str, symbols=len(symbols), processed=total,
+        completed=len(uploaded_today), skipped=len(pipeline.skipped),
+        errors=[{"symbol": sym, "stage": stage, "error": repr(e)} for sym, stage, e in pipeline.errors],
+        pipeline={st.name: {"workers": st.workers, "busy": round(st.busy, 2)} for st in pipeline.stages},
+    )
+    print(f"📝 実行レポート: {RUN_REPORT_PATH}")
+    if trace_enabled:
+        trace_path = args.trace or TRACE_PATH
+        count = tracer.write(trace_path)
+        print(f"🧭 トレース出力: {trace_path}（{count}区間）")
     return uploaded_today
 
 if __name__ == "__main__":
-    uploaded_today = main()
+    args = parse_args()
+    if args.drain_uploads:
+        init_storage()
+        drain_uploads_only()
+        sys.exit(0)
+
+    uploaded_today = main(args)
     # オプション：アップロードした分をCSVにも保存
     if uploaded_today:
         daily_folder = os.path.join("result", today_str)  # 例: result/2025-06-23/
@@ -306,7 +553,7 @@ if __name__ == "__main__":
     # ✅ Slack通知（ファイル添付付き：Bot連携）
     from slack_notifier import send_summary_with_files
 
-    if ENABLE_SLACK and (buy_entries or sell_entries):
+    if args.slack and (buy_entries or sell_entries):
         send_summary_with_files(
             buy_csv_path=buy_csv_path,
             sell_csv_path=sell_csv_path,
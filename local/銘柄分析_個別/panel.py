@@ -0,0 +1,237 @@
+# ==============================
+# Sec｜panel.py｜全銘柄をまとめた指標計算（日付 × 銘柄の2次元配列）
+# ==============================
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators import (
+    INDICATOR_COLS, compute_indicators,
+    RSI_WINDOW, MACD_FAST, MACD_SLOW, MACD_SIGN, BB_WINDOW, BB_DEV,
+    ADX_WINDOW, STOCH_WINDOW, ATR_WINDOW,
+)
+
+PANEL_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# ==========================
+# 列方向（axis=0）の基本演算：各列は先頭から欠損なしの前提
+# ==========================
+
+def _rolling(x, window, func):
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = func(sliding_window_view(x, window, axis=0), axis=-1)
+    return out
+
+def _shift(x, periods):
+    out = np.full(x.shape, np.nan)
+    if periods < len(x):
+        out[periods:] = x[:len(x) - periods]
+    return out
+
+def _ewm(x, alpha, min_periods, start=0):
+    """
+    ewm(alpha, adjust=False) を行方向にループし、全銘柄を同時に更新する。
+    start 行目から再帰を始める（MACDシグナルのように先頭が NaN の系列用）。
+    """
+    out = np.full(x.shape, np.nan)
+    if len(x) <= start:
+        return out
+    y = x[start].copy()
+    out[start] = y
+    for i in range(start + 1, len(x)):
+        y = y + alpha * (x[i] - y)
+        out[i] = y
+    out[start:start + min_periods - 1] = np.nan
+    return out
+
+def _rsi(close, window=RSI_WINDOW):
+    diff = np.diff(close, axis=0, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    emaup = _ewm(up, 1 / window, window)
+    emadn = _ewm(down, 1 / window, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(emadn == 0, 100.0, 100 - 100 / (1 + emaup / emadn))
+
+def _atr(high, low, close, window=ATR_WINDOW):
+    prev = _shift(close, 1)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+    out = np.zeros(close.shape)
+    if len(tr) < window:
+        return out
+    a = tr[:window].mean(axis=0)
+    out[window - 1] = a
+    for i in range(window, len(tr)):
+        a = (a * (window - 1) + tr[i]) / window
+        out[i] = a
+    return out
+
+def _wilder_sum(x, length, window):
+    out = np.zeros((length,) + x.shape[1:])
+    if length == 0:
+        return out
+    s = x[1:window + 1].sum(axis=0)
+    out[0] = s
+    for i in range(1, length - 1):
+        s = s - s / window + x[window + i]
+        out[i] = s
+    return out
+
+def _adx(high, low, close, window=ADX_WINDOW):
+    n = len(close)
+    out = np.zeros(close.shape)
+    length = n - (window - 1)
+    if length <= window:
+        return out
+
+    prev_close = _shift(close, 1)
+    tr = np.maximum(high, prev_close) - np.minimum(low, prev_close)
+    diff_up = high - _shift(high, 1)
+    diff_down = _shift(low, 1) - low
+    pos = np.where((diff_up > diff_down) & (diff_up > 0), diff_up, 0.0)
+    neg = np.where((diff_down > diff_up) & (diff_down > 0), diff_down, 0.0)
+
+    trs = _wilder_sum(tr, length, window)
+    dip = _wilder_sum(pos, length, window)
+    din = _wilder_sum(neg, length, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        di_pos = np.where(trs != 0, 100 * dip / trs, 0.0)
+        di_neg = np.where(trs != 0, 100 * din / trs, 0.0)
+        di_sum = di_pos + di_neg
+        dx = np.where(di_sum != 0, 100 * np.abs((di_pos - di_neg) / di_sum), 0.0)
+
+    series = np.zeros((length,) + close.shape[1:])
+    a = dx[:window].mean(axis=0)
+    series[window] = a
+    for i in range(window + 1, length):
+        a = (a * (window - 1) + dx[i - 1]) / window
+        series[i] = a
+    out[window - 1:] = series
+    return out
+
+def compute_panel_block(high, low, close):
+    """
+    先頭行から欠損のない (日付 × 銘柄) 配列に対して INDICATOR_COLS を一括計算する。
+    """
+    out = {}
+    rmax = lambda x, w: _rolling(x, w, np.max)
+    rmin = lambda x, w: _rolling(x, w, np.min)
+
+    out["MA5"] = _rolling(close, 5, np.mean)
+    out["MA25"] = _rolling(close, 25, np.mean)
+    out["MA75"] = _rolling(close, 75, np.mean)
+    out["RSI"] = _rsi(close)
+    line = (_ewm(close, 2 / (MACD_FAST + 1), MACD_FAST)
+            - _ewm(close, 2 / (MACD_SLOW + 1), MACD_SLOW))
+    out["MACD"] = line
+    out["MACD_signal"] = _ewm(line, 2 / (MACD_SIGN + 1), MACD_SIGN, start=MACD_SLOW - 1)
+    out["MACD_diff"] = out["MACD"] - out["MACD_signal"]
+
+    bb_mid = _rolling(close, BB_WINDOW, np.mean)
+    bb_std = _rolling(close, BB_WINDOW, np.std)
+    out["BB_High"] = out["BB_upper"] = bb_mid + BB_DEV * bb_std
+    out["BB_Low"] = out["BB_lower"] = bb_mid - BB_DEV * bb_std
+    out["BB_middle"] = bb_mid
+
+    out["ADX"] = _adx(high, low, close)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        smin, smax = rmin(low, STOCH_WINDOW), rmax(high, STOCH_WINDOW)
+        out["STOCH_K"] = 100 * (close - smin) / (smax - smin)
+
+    out["tenkan"] = (rmax(high, 9) + rmin(low, 9)) / 2
+    out["kijun"] = (rmax(high, 26) + rmin(low, 26)) / 2
+    out["senkou1"] = _shift((out["tenkan"] + out["kijun"]) / 2, 26)
+    out["senkou2"] = _shift((rmax(high, 52) + rmin(low, 52)) / 2, 26)
+    out["KAIRI_25"] = (close - out["MA25"]) / out["MA25"] * 100
+    out["ATR"] = _atr(high, low, close)
+    return out
+
+# ==========================
+# パネル本体
+# ==========================
+
+class IndicatorPanel:
+    """
+    全銘柄の OHLCV を (日付 × 銘柄) の行列に揃えて指標を列方向に一括計算する。
+    上場日が違う銘柄は開始行ごとにまとめて計算し、途中に欠損日がある銘柄だけ1銘柄ずつ計算する。
+    """
+    def __init__(self, frames):
+        frames = {s: self._naive(df) for s, df in frames.items() if df is not None and not df.empty}
+        self.symbols = list(frames)
+        self.dates = pd.DatetimeIndex(sorted(set().union(*[frames[s].index for s in self.symbols]))) \
+            if self.symbols else pd.DatetimeIndex([])
+        self.fields = {
+            f: np.column_stack([frames[s][f].reindex(self.dates).to_numpy(dtype=np.float64) for s in self.symbols])
+            if self.symbols else np.empty((0, 0))
+            for f in PANEL_FIELDS
+        }
+        self.values = {c: np.full(self.fields["Close"].shape, np.nan) for c in INDICATOR_COLS}
+        self._col = {s: i for i, s in enumerate(self.symbols)}
+        self._compute()
+
+    @staticmethod
+    def _naive(df):
+        # 差分取得（日付のみ）と全期間取得（タイムゾーン付き）の混在に備えて日付に揃える
+        if df.index.tz is not None:
+            df = df.copy()
+            df.index = df.index.tz_localize(None).normalize()
+        return df
+
+    def __contains__(self, symbol):
+        return symbol in self._col
+
+    def _compute(self):
+        close = self.fields["Close"]
+        if close.size == 0:
+            return
+        valid = ~np.isnan(close)
+        first = np.where(valid.any(axis=0), valid.argmax(axis=0), len(close))
+        # 開始行以降に欠損がない銘柄（大多数）はまとめて計算
+        contiguous = valid.sum(axis=0) == (len(close) - first)
+
+        for start in np.unique(first[contiguous]):
+            cols = np.flatnonzero(contiguous & (first == start))
+            block = compute_panel_block(
+                self.fields["High"][start:, cols], self.fields["Low"][start:, cols], close[start:, cols]
+            )
+            for c in INDICATOR_COLS:
+                self.values[c][start:, cols] = block[c]
+
+        # 途中で欠損のある銘柄は自分の足だけで1銘柄ずつ計算（個別計算と同じ結果にする）
+        for col in np.flatnonzero(~contiguous):
+            rows = np.flatnonzero(valid[:, col])
+            if len(rows) == 0:
+                continue
+            result = compute_indicators(
+                self.fields["Open"][rows, col], self.fields["High"][rows, col],
+                self.fields["Low"][rows, col], close[rows, col],
+            )
+            for c in INDICATOR_COLS:
+                self.values[c][rows, col] = result[c]
+
+    def frame(self, symbol):
+        """
+        1銘柄分の OHLCV＋指標の DataFrame（add_indicators 後の df と同じ形）を返す。
+        """
+        col = self._col[symbol]
+        rows = ~np.isnan(self.fields["Close"][:, col])
+        data = {f: self.fields[f][rows, col] for f in PANEL_FIELDS}
+        data.update({c: self.values[c][rows, col] for c in INDICATOR_COLS})
+        return pd.DataFrame(data, index=self.dates[rows])
+
+    def latest(self):
+        """
+        各銘柄の最新足の指標を1行ずつ並べた表（銘柄 × 指標）を返す。
+        """
+        close = self.fields["Close"]
+        if close.size == 0:
+            return pd.DataFrame(columns=["date"] + PANEL_FIELDS + INDICATOR_COLS)
+        last = len(close) - 1 - (~np.isnan(close[::-1])).argmax(axis=0)
+        cols = np.arange(len(self.symbols))
+        data = {"date": self.dates[last]}
+        data.update({f: self.fields[f][last, cols] for f in PANEL_FIELDS})
+        data.update({c: self.values[c][last, cols] for c in INDICATOR_COLS})
+        return pd.DataFrame(data, index=pd.Index(self.symbols, name="symbol"))
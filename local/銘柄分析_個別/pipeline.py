@@ -0,0 +1,139 @@
+# ==============================
+# Sec｜pipeline.py｜段ごとに並列数を決める有界キューのパイプライン
+# ==============================
+
+import queue
+import threading
+import time
+
+# 段と段の間に溜められる件数（これを超えると前段が待つ）
+PIPELINE_QUEUE_SIZE = 8
+
+_DONE = object()  # 前段がすべて終わった合図
+
+class SkipItem(Exception):
+    """
+    想定内の理由（データなし等）でこの件を後段に流さないときに送出する。
+    """
+
+class Stage:
+    """
+    パイプラインの1段。func(item) の戻り値が次の段に渡る（None ならそこで終わり）。
+    workers：この段を同時に処理するスレッド数／queue_size：この段の入力キューの上限
+    """
+    def __init__(self, name, func, workers=1, queue_size=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.processed = 0
+        self.busy = 0.0  # func に費やした合計秒数（全スレッド分）
+
+class Pipeline:
+    """
+    items を先頭の段から順に流す。段と段の間は上限付きキューでつなぎ、
+    後段が詰まると前段の put が待つ（バックプレッシャー）。
+    1件の例外はその件・その段だけ errors に記録し、他の件は流し続ける。
+    """
+    def __init__(self, stages, key=lambda item: item, on_error=None, on_skip=None, tracer=None):
+        self.stages = list(stages)
+        self.key = key
+        # tracer（trace_events.TraceRecorder）を渡すと段×件ごとの区間と、後段待ちの区間を記録する
+        self.tracer = tracer
+        self.on_error = on_error
+        self.on_skip = on_skip
+        self.errors = []    # (キー, 段の名前, 例外)
+        self.skipped = []   # (キー, 段の名前, 理由)
+        self.results = []   # 最後の段の戻り値（None 以外）
+        self.finished = 0   # パイプラインを抜けた件数（完了・スキップ・失敗すべて）
+        self._lock = threading.Lock()
+
+    def _finish(self):
+        with self._lock:
+            self.finished += 1
+
+    def _worker(self, index, inbox, outbox, remaining):
+        stage = self.stages[index]
+        tracer = self.tracer
+        wait_name = f"wait:{self.stages[index + 1].name}" if outbox is not None else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                with self._lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                # この段の最後のスレッドが次の段へ終了を伝える
+                if last and outbox is not None:
+                    for _ in range(self.stages[index + 1].workers):
+                        outbox.put(_DONE)
+                return
+
+            key = self.key(item)
+            t0 = time.perf_counter()
+            try:
+                if tracer is None:
+                    result = stage.func(item)
+                else:
+                    with tracer.span(stage.name, cat="pipeline", symbol=key):
+                        result = stage.func(item)
+            except SkipItem as e:
+                self.skipped.append((key, stage.name, str(e)))
+                if self.on_skip:
+                    self.on_skip(key, stage.name, e)
+                self._finish()
+                continue
+            except Exception as e:
+                self.errors.append((key, stage.name, e))
+                if self.on_error:
+                    self.on_error(key, stage.name, e)
+                self._finish()
+                continue
+            finally:
+                with self._lock:
+                    stage.processed += 1
+                    stage.busy += time.perf_counter() - t0
+
+            if result is None:
+                self._finish()
+            elif outbox is None:
+                self.results.append(result)
+                self._finish()
+            elif tracer is None:
+                outbox.put(result)  # 次の段が詰まっていればここで待つ
+            else:
+                with tracer.span(wait_name, cat="backpressure", symbol=key):
+                    outbox.put(result)
+
+    def run(self, items):
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        remaining = [stage.workers for stage in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            outbox = queues[index + 1] if index + 1 < len(queues) else None
+            for n in range(stage.workers):
+                t = threading.Thread(target=self._worker, args=(index, queues[index], outbox, remaining),
+                                     name=f"{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        # 先頭の段への投入も上限付き（取得が先行しすぎない）
+        for item in items:
+            queues[0].put(item)
+        for _ in range(self.stages[0].workers):
+            queues[0].put(_DONE)
+
+        for t in threads:
+            while t.is_alive():
+                t.join(0.5)  # Ctrl+C を受け付けるため短く区切って待つ
+        return self.results
+
+    def summary(self):
+        """
+        段ごとの件数・処理時間（一番遅い段が全体の所要時間を決める）。
+        """
+        lines = []
+        for stage in self.stages:
+            per_worker = stage.busy / stage.workers
+            lines.append(f"  {stage.name:<8} {stage.processed:>5}件 │ 処理 {stage.busy:7.1f}秒"
+                         f"（並列{stage.workers} → 実質 {per_worker:6.1f}秒）")
+        return "\n".join(lines)
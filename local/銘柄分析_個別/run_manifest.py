@@ -0,0 +1,115 @@
+# ==============================
+# Sec｜run_manifest.py｜実行日ごとの進捗記録（--resume で途中から再開する）
+# ==============================
+
+import os
+import json
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from database import connection
+
+# 1銘柄の処理段（この順に進む）
+RUN_STAGES = ("fetch", "analyze", "render", "record")
+
+def init_run_manifest():
+    with connection() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS run_manifest (
+            run_date TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            data TEXT,
+            done_at TEXT,
+            PRIMARY KEY (run_date, symbol, stage)
+        )
+        """)
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def write_run_stage(conn, run_date, symbol, stage, data=None):
+    """
+    conn を受け取る版（DBWriter.submit で価格データと同じトランザクションに載せる）。
+    """
+    conn.execute(
+        "INSERT OR REPLACE INTO run_manifest (run_date, symbol, stage, data, done_at) VALUES (?, ?, ?, ?, ?)",
+        (run_date, symbol, stage, json.dumps(data, ensure_ascii=False) if data is not None else None, _now()),
+    )
+
+class RunManifest:
+    """
+    実行日（run_date）ごとに、銘柄ごとの完了済みの段と、その段の結果（分析結果・画像パス等）を記録する。
+    取得した株価は checkpoint_dir に pickle で残し、記録（record）まで終わったら消す。
+    """
+    def __init__(self, run_date, checkpoint_dir):
+        self.run_date = run_date
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self._done = {}  # symbol → {stage: data}
+        with connection() as conn:
+            rows = conn.execute(
+                "SELECT symbol, stage, data FROM run_manifest WHERE run_date = ?", (run_date,)
+            ).fetchall()
+        for symbol, stage, data in rows:
+            self._done.setdefault(symbol, {})[stage] = json.loads(data) if data else None
+
+    def reset(self):
+        """
+        同じ日の記録を消して最初からやり直す（--resume なしの通常実行）。
+        """
+        with connection() as conn:
+            conn.execute("DELETE FROM run_manifest WHERE run_date = ?", (self.run_date,))
+        self._done = {}
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+    def completed(self, symbol):
+        return set(self._done.get(symbol, {}))
+
+    def data(self, symbol, stage):
+        return self._done.get(symbol, {}).get(stage)
+
+    def next_stage(self, symbol):
+        """
+        その銘柄の最初の未完了の段（すべて完了なら None）。
+        """
+        done = self.completed(symbol)
+        return next((stage for stage in RUN_STAGES if stage not in done), None)
+
+    def mark(self, symbol, stage, data=None):
+        with connection() as conn:
+            write_run_stage(conn, self.run_date, symbol, stage, data)
+        self._done.setdefault(symbol, {})[stage] = data
+
+    def _frame_path(self, symbol):
+        return self.checkpoint_dir / f"{symbol}.pkl"
+
+    def save_frame(self, symbol, df, name):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        tmp_path = self._frame_path(symbol).with_suffix(".tmp")
+        pd.to_pickle((df, name), tmp_path)
+        os.replace(tmp_path, self._frame_path(symbol))
+
+    def load_frame(self, symbol):
+        """
+        取得済みの株価 (df, name)。ファイルが無ければ (None, None)。
+        """
+        path = self._frame_path(symbol)
+        if not path.exists():
+            return None, None
+        return pd.read_pickle(path)
+
+    def drop_frame(self, symbol):
+        self._frame_path(symbol).unlink(missing_ok=True)
+
+    def counts(self, symbols):
+        """
+        再開時の内訳：{最初の未完了の段（完了は "done"）: 件数}
+        """
+        counts = {}
+        for symbol in symbols:
+            stage = self.next_stage(symbol) or "done"
+            counts[stage] = counts.get(stage, 0) + 1
+        return counts
@@ -0,0 +1,146 @@
+# ==============================
+# Sec｜run_stats.py｜段ごとの処理時間（ヒストグラム・p50/p95）と残り時間の見積もり
+# ==============================
+
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# ヒストグラムの区切り（秒）。最後の区切りを超えた分は "+Inf" に入る
+STAT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 残り時間の平滑化係数（大きいほど直近の処理間隔を重く見る）
+ETA_ALPHA = 0.1
+
+class RunStats:
+    """
+    段ごとの処理時間を集計する（複数スレッドから呼んでよい）。
+    with stats.measure("fetch"): ... で1回分を記録する。
+    """
+    def __init__(self, stages=(), tracer=None):
+        self._samples = {stage: [] for stage in stages}  # 表示順を固定するため先に並べておく
+        self.tracer = tracer  # trace_events.TraceRecorder を渡すと計測区間をトレースにも残す
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    @contextmanager
+    def measure(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            t1 = time.perf_counter()
+            self.add(stage, t1 - t0)
+            if self.tracer is not None:
+                self.tracer.add_span(stage, t0 * 1e6, t1 * 1e6, cat="timing")
+
+    def timed(self, stage, func):
+        """
+        func を呼ぶたびに処理時間を記録する版を返す（別スレッドで実行される関数用）。
+        """
+        def wrapper(*args, **kwargs):
+            with self.measure(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self._t0
+
+    def stage_summary(self, stage):
+        with self._lock:
+            samples = np.array(self._samples.get(stage, []), dtype=np.float64)
+        if samples.size == 0:
+            return {"count": 0}
+        counts = np.bincount([bisect_left(STAT_BUCKETS, s) for s in samples], minlength=len(STAT_BUCKETS) + 1)
+        labels = [f"{b:g}" for b in STAT_BUCKETS] + ["+Inf"]
+        p50, p95 = np.percentile(samples, [50, 95])
+        return {
+            "count": int(samples.size),
+            "total": round(float(samples.sum()), 4),
+            "mean": round(float(samples.mean()), 4),
+            "p50": round(float(p50), 4),
+            "p95": round(float(p95), 4),
+            "max": round(float(samples.max()), 4),
+            # 「その秒数以下」の件数（区切りごと、累積ではない）
+            "histogram": {label: int(c) for label, c in zip(labels, counts)},
+        }
+
+    def summary(self):
+        return {stage: self.stage_summary(stage) for stage in list(self._samples)}
+
+    def format_table(self):
+        lines = [f"  {'段':<10}{'件数':>6}{'合計(秒)':>10}{'p50':>9}{'p95':>9}{'最大':>9}"]
+        for stage, s in self.summary().items():
+            if not s["count"]:
+                continue
+            lines.append(f"  {stage:<10}{s['count']:>6}{s['total']:>10.1f}"
+                         f"{s['p50']:>9.3f}{s['p95']:>9.3f}{s['max']:>9.3f}")
+        return "\n".join(lines)
+
+    def write_report(self, path, **extra):
+        """
+        機械可読なレポート（日ごとに残して処理時間の悪化を追う）。
+        """
+        report = {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed": round(self.elapsed, 2),
+            **extra,
+            "stages": self.summary(),
+        }
+        os.makedirs(Path(path).parent, exist_ok=True)
+        tmp_path = Path(str(path) + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return report
+
+class EwmaEta:
+    """
+    完了間隔の指数移動平均から残り時間を見積もる（1件だけ遅くても大きく跳ねない）。
+    """
+    def __init__(self, total, alpha=ETA_ALPHA):
+        self.total = total
+        self.alpha = alpha
+        self.interval = None  # 1件あたりの平滑化した秒数
+        self.done = 0
+        self._t0 = time.perf_counter()
+        self._last = None
+
+    def update(self, done):
+        """
+        完了件数 done を反映し、残り秒数を返す。
+        """
+        if done <= self.done:
+            return self.remaining()
+        now = time.perf_counter()
+        # 最初の1件はパイプラインが埋まるまでの待ちを含むので、間隔の計測はその次から
+        if self._last is not None:
+            interval = (now - self._last) / (done - self.done)
+            if self.interval is None:
+                self.interval = interval
+            else:
+                self.interval = self.alpha * interval + (1 - self.alpha) * self.interval
+        self._last = now
+        self.done = done
+        return self.remaining()
+
+    def remaining(self):
+        left = max(0, self.total - self.done)
+        if self.interval is not None:
+            return self.interval * left
+        if self.done:
+            return (time.perf_counter() - self._t0) / self.done * left
+        return 0.0
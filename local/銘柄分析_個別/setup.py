@@ -0,0 +1,43 @@
+# ==============================
+# Sec｜Setup.py
+# ==============================
+
+"""
+初回実行時に必要なライブラリ：
+pip install -r requirements.txt
+または個別に以下を実行してください：
+
+pip install yfinance japanize-matplotlib mplfinance ta pandas matplotlib openpyxl
+"""
+
+#print("📄 このファイルは実行されています:", __file__)
+
+import sys
+from pathlib import Path
+
+import matplotlib.pyplot as plt
+import matplotlib.font_manager as fm
+
+# ✅ グローバルフォント設定（日本語表示用）
+JP_FONT = "IPAexGothic"
+plt.rcParams['font.family'] = JP_FONT
+
+# ✅ Excelファイルパス
+EXCEL_PATH = "Symbols.xlsx"
+
+# ✅ 銘柄マスタ（JPX上場銘柄一覧 data_j.xls は 初動 側と共用）
+SYMBOL_MASTER_DIR = Path(__file__).resolve().parent.parent / "銘柄分析_初動"
+
+def use_shared_modules():
+    """
+    銘柄分析_初動 側の共用モジュール（symbol_master / trace_events）を import できるようにする。
+    共用モジュールを import する前に呼ぶこと（何度呼んでもよい）。
+    """
+    path = str(SYMBOL_MASTER_DIR)
+    if path not in sys.path:
+        sys.path.append(path)
+
+# ✅ 使用可能なIPAフォント確認（任意）
+for f in fm.fontManager.ttflist:
+    if 'IPAex' in f.name:
+        print("✅ 利用可能なIPAフォント:", f.name, f.fname)
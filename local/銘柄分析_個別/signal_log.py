@@ -0,0 +1,132 @@
+# ==============================
+# Sec｜signal_log.py｜シグナルログ（追記専用 JSONL ＋ メモリ索引）
+# ==============================
+
+import os
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+# 死んだ行（置き換え済みの古いエントリ）がこの割合を超えたら compact_if_needed で詰め直す
+COMPACT_DEAD_RATIO = 0.5
+
+def entry_key(entry):
+    # 一意な識別キー（symbol + date + name）で重複判定
+    return (entry.get("symbol"), entry.get("date"), entry.get("name"))
+
+class SignalLog:
+    """
+    1エントリ1行の JSONL に追記していくシグナルログ。
+    同じ (symbol, date, name) のエントリは後から書いた行が有効（旧 JSON と同じ置き換え動作）。
+    追記は1行書くだけ（O(1)）で、全体の書き直しは compact / export_json のときだけ行う。
+    """
+    def __init__(self, path, legacy_json=None):
+        self.path = Path(path)
+        self._index = {}
+        self._lines = 0
+        os.makedirs(self.path.parent, exist_ok=True)
+
+        if self.path.exists():
+            self._load()
+        elif legacy_json and os.path.exists(legacy_json):
+            self._import_legacy(legacy_json)
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で落ちた末尾行などは読み飛ばす
+                    print(f"⚠️ シグナルログの壊れた行をスキップ: {self.path}")
+                    continue
+                self._apply(entry)
+                self._lines += 1
+
+    def _import_legacy(self, legacy_json):
+        """
+        旧形式（JSON配列）のログを初回だけ取り込む。
+        """
+        with open(legacy_json, "r", encoding="utf-8") as f:
+            for entry in json.load(f):
+                self._apply(entry)
+        self.compact()
+        print(f"🔁 旧シグナルログを取り込み: {legacy_json} → {self.path}（{len(self._index)}件）")
+
+    def _apply(self, entry):
+        key = entry_key(entry)
+        # 置き換え時は末尾に回す（旧 JSON の「削除して追加」と同じ並び順）
+        self._index.pop(key, None)
+        self._index[key] = entry
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def line_count(self):
+        # ファイル上の行数（置き換え済みの古い行を含む）
+        return self._lines
+
+    def append(self, entry):
+        entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._apply(entry)
+        self._lines += 1
+
+    def get(self, symbol, date, name):
+        return self._index.get((symbol, date, name))
+
+    def entries(self):
+        return list(self._index.values())
+
+    def hashes(self):
+        return set(e["hash"] for e in self._index.values() if e.get("hash"))
+
+    def compact(self):
+        """
+        有効なエントリだけでファイルを書き直す（一時ファイル → 置き換え）。
+        """
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._index.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+        self._lines = len(self._index)
+
+    def compact_if_needed(self, dead_ratio=COMPACT_DEAD_RATIO):
+        dead = self._lines - len(self._index)
+        if self._lines and dead / self._lines > dead_ratio:
+            self.compact()
+            return True
+        return False
+
+    def export_json(self, json_path):
+        """
+        旧形式と同じ JSON 配列（indent=2）で書き出す。
+        """
+        os.makedirs(Path(json_path).parent, exist_ok=True)
+        tmp_path = Path(str(json_path) + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, json_path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="シグナルログ（JSONL）の保守")
+    parser.add_argument("path", help="シグナルログのパス（例: result/signal_log_2025.jsonl）")
+    parser.add_argument("--compact", action="store_true", help="置き換え済みの古い行を削除して詰め直す")
+    parser.add_argument("--export", metavar="JSON_PATH", help="旧形式の JSON 配列として書き出す")
+    args = parser.parse_args()
+
+    log = SignalLog(args.path)
+    if args.compact:
+        before = log.line_count
+        log.compact()
+        print(f"🧹 コンパクション完了: {before}行 → {len(log)}行")
+    if args.export:
+        log.export_json(args.export)
+        print(f"📤 JSON書き出し: {args.export}（{len(log)}件）")
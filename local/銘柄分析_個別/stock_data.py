@@ -0,0 +1,95 @@
+# ==============================
+# Sec｜stock_data.py
+# ==============================
+
+import pandas as pd
+import yfinance as yf
+from setup import EXCEL_PATH, use_shared_modules
+from database import load_price_history
+
+use_shared_modules()
+from symbol_master import resolve_name
+
+#print("📄 このファイルは実行されています:", __file__)
+
+FETCH_PERIOD = "18mo"
+FETCH_MONTHS = 18          # FETCH_PERIOD と同じ期間（差分取得時の切り出し用）
+OHLCV_COLS = ["Open", "High", "Low", "Close", "Volume"]
+ADJUST_TOLERANCE = 1e-3    # 重なり日の終値がこれ以上ずれたら分割・配当調整ありとみなす
+COVERAGE_SLACK_DAYS = 10   # 保存済みの先頭日がこれ以上遅ければ期間不足として全期間取得
+
+def get_symbols_from_excel():
+    try:
+        df = pd.read_excel(EXCEL_PATH)
+        df.columns = df.columns.str.strip().str.lower()
+        if "symbol" not in df.columns:
+            raise ValueError("❌ 'symbol'列が見つかりません")
+
+        # 数値を文字列化＋.T付加（既に.Tが付いていればそのまま）
+        return df["symbol"].dropna().astype(str).apply(lambda s: s if ".T" in s else f"{s}.T").tolist()
+    except Exception as e:
+        print(f"❌ Excel読み込み失敗: {e}")
+        return []
+
+def fetch_stock_data(symbol, incremental=False):
+    """
+    incremental=True の場合は price_history に保存済みの足を使い、
+    最終保存日以降の足だけを yfinance から取得して結合する（失敗時は全期間取得にフォールバック）。
+    """
+    if incremental:
+        df, name = _fetch_incremental(symbol)
+        if df is not None:
+            return df, name
+
+    try:
+        # ✅ 銘柄名はローカルの銘柄マスタから取得（Ticker.info の通信を行わない）
+        name = resolve_name(symbol, default=symbol)
+        df = yf.Ticker(symbol).history(period=FETCH_PERIOD, interval="1d")
+        if df.empty:
+            raise ValueError("データが空です")
+        df = df.dropna(subset=OHLCV_COLS).copy()
+        return df, name
+    except Exception as e:
+        print(f"❌ データ取得失敗: {symbol} - {e}")
+        return None, symbol
+
+def _fetch_incremental(symbol):
+    """
+    保存済みの足＋差分の足を結合して返す。差分取得が使えない場合は (None, None)。
+    """
+    try:
+        stored, stored_name = load_price_history(symbol)
+        if stored.empty:
+            return None, None
+        name = resolve_name(symbol, default=stored_name or symbol)
+        stored = stored.dropna(subset=OHLCV_COLS)
+
+        today = pd.Timestamp.today().normalize()
+        start = today - pd.DateOffset(months=FETCH_MONTHS)
+        if stored.index[0] > start + pd.Timedelta(days=COVERAGE_SLACK_DAYS):
+            return None, None
+        # ✅ 最終保存日の足は当日途中の値の可能性があるので毎回取り直す。
+        # 　価格調整のずれはその1本前（確定済みの足）で確認する
+        check_date = stored.index[-2] if len(stored) >= 2 else stored.index[-1]
+        new = yf.Ticker(symbol).history(start=check_date.strftime("%Y-%m-%d"), interval="1d")
+        new = new.dropna(subset=OHLCV_COLS)
+        if not new.empty:
+            new.index = new.index.tz_localize(None).normalize()
+            new.index.name = "Date"
+            if check_date in new.index:
+                old_close = stored.loc[check_date, "Close"]
+                new_close = new.loc[check_date, "Close"]
+                if abs(new_close - old_close) > abs(old_close) * ADJUST_TOLERANCE:
+                    print(f"🔁 価格調整を検知（{symbol}）→ 全期間を再取得")
+                    return None, None
+            stored = pd.concat([stored, new[OHLCV_COLS]])
+            stored = stored[~stored.index.duplicated(keep="last")].sort_index()
+
+        # ✅ 全期間取得（period="18mo"）と同じ範囲に切り出す
+        df = stored[stored.index >= start][OHLCV_COLS].copy()
+        if df.empty:
+            return None, None
+        return df, name
+    except Exception as e:
+        print(f"⚠️ 差分取得失敗: {symbol} - {e} → 全期間取得に切り替え")
+        return None, None
@@ -0,0 +1,147 @@
+# ==============================
+# Sec｜upload_queue.py｜アップロード待ちキュー（SQLite・中断後に再開できる）
+# ==============================
+
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+
+from database import connection
+from image_artifact import ImageArtifact
+from hash_store import get_upload_url
+from gyazo_uploader import UploadPool, UPLOAD_WORKERS
+
+# この回数失敗したら failed にして自動では再送しない
+UPLOAD_MAX_ATTEMPTS = 5
+
+# キュー送信時に読み込んで送信待ちにしておく画像の上限（送信スレッド数あたり）
+DRAIN_INFLIGHT_PER_WORKER = 2
+
+def init_upload_queue():
+    with connection() as conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS upload_queue (
+            hash TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            symbol TEXT,
+            name TEXT,
+            date TEXT,
+            desc TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',   -- pending / done / failed
+            attempts INTEGER NOT NULL DEFAULT 0,
+            url TEXT,
+            last_error TEXT,
+            enqueued_at TEXT,
+            updated_at TEXT
+        )
+        """)
+        conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_upload_queue_status
+        ON upload_queue(status, enqueued_at)
+        """)
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+def enqueue_upload(artifact, symbol=None, name=None, date=None, desc=None):
+    """
+    描画直後に呼ぶ。1行 INSERT するだけ（同じハッシュが積まれていれば何もしない）。
+    """
+    with connection() as conn:
+        conn.execute("""
+            INSERT OR IGNORE INTO upload_queue (hash, path, symbol, name, date, desc, enqueued_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (artifact.hash, artifact.path, symbol, name, date, desc, _now(), _now()))
+
+def pending_uploads(limit=None):
+    query = "SELECT * FROM upload_queue WHERE status = 'pending' ORDER BY enqueued_at"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    with connection() as conn:
+        cursor = conn.execute(query)
+        cols = [c[0] for c in cursor.description]
+        return [dict(zip(cols, row)) for row in cursor.fetchall()]
+
+def count_pending():
+    with connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM upload_queue WHERE status = 'pending'").fetchone()[0]
+
+def mark_uploaded(image_hash, url):
+    with connection() as conn:
+        conn.execute(
+            "UPDATE upload_queue SET status = 'done', url = ?, updated_at = ? WHERE hash = ?",
+            (url, _now(), image_hash),
+        )
+
+def mark_failed(image_hash, error, permanent=False):
+    """
+    失敗を記録する。UPLOAD_MAX_ATTEMPTS 回目、または permanent=True（画像が無い等）なら failed にする。
+    """
+    max_attempts = 0 if permanent else UPLOAD_MAX_ATTEMPTS
+    with connection() as conn:
+        conn.execute("""
+            UPDATE upload_queue
+            SET attempts = attempts + 1,
+                status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                last_error = ?, updated_at = ?
+            WHERE hash = ?
+        """, (max_attempts, str(error), _now(), image_hash))
+
+def drain_upload_queue(uploader, max_workers=UPLOAD_WORKERS, on_uploaded=None, limit=None):
+    """
+    キューに残っている画像を保存済みファイルから読み込んでアップロードする（再描画はしない）。
+    on_uploaded(item, url) は成功ごとに呼び出し元スレッドで呼ぶ。
+    戻り値：{"done": 件数, "failed": 件数}
+    """
+    items = pending_uploads(limit)
+    counts = {"done": 0, "failed": 0}
+    if not items:
+        return counts
+
+    def finish(item, url, error="アップロード失敗", permanent=False):
+        if url:
+            mark_uploaded(item["hash"], url)
+            counts["done"] += 1
+            if on_uploaded:
+                on_uploaded(item, url)
+        else:
+            mark_failed(item["hash"], error, permanent=permanent)
+            counts["failed"] += 1
+
+    def collect(futures):
+        for future in futures:
+            try:
+                url = future.result()
+            except Exception as e:
+                print(f"❌ アップロード失敗: {e}")
+                url = None
+            finish(running.pop(future), url)
+
+    print(f"📤 アップロード待ちキュー: {len(items)}件を送信")
+    max_inflight = max(1, max_workers) * DRAIN_INFLIGHT_PER_WORKER
+    with UploadPool(uploader, max_workers=max_workers) as pool:
+        running = {}
+        for item in items:
+            # 別の経路ですでにアップロード済みなら URL だけ引き継ぐ
+            url = get_upload_url(item["hash"])
+            if url:
+                finish(item, url)
+                continue
+            if not Path(item["path"]).exists():
+                print(f"❌ 画像ファイルが見つかりません: {item['path']}")
+                finish(item, None, "画像ファイルが見つかりません", permanent=True)
+                continue
+            # 同じ日に同じ銘柄を描き直すとファイルが上書きされる。積んだ時と中身が違えば送らない
+            artifact = ImageArtifact.from_file(item["path"])
+            if artifact.hash != item["hash"]:
+                print(f"⏭ 画像が描き直されています（送信しない）: {item['path']}")
+                finish(item, None, "superseded（画像ファイルが上書きされた）", permanent=True)
+                continue
+            # 読み込んだ画像を抱えすぎないよう、送信待ちが上限に達したら1件終わるまで待つ
+            if len(running) >= max_inflight:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                collect(done)
+            running[pool.submit(artifact, desc=item["desc"])] = item
+
+        collect(list(running))
+    return counts
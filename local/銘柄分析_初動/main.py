@@ -1,11 +1,14 @@
 
 import pandas as pd
-import yfinance as yf
 import time
 import csv
 import random
+import argparse
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from price_provider import YFinanceProvider, FakeProvider, fetch_in_batches
+from symbol_master import load_symbol_master, filter_market
+from trace_events import TraceRecorder, NULL_TRACER
 
 from datetime import datetime
 
@@ -19,7 +22,8 @@ DATA_XLS_PATH = Path("data_j.xls")
 RESULT_CSV_PATH = Path("initial_move_candidates.csv")
 FETCH_PERIOD = "10d"
 MIN_VOLUME = 50000
-MAX_WORKERS = 10  # 並列数（PCに合わせて調整）
+BATCH_SIZE = 100  # 1回の一括ダウンロードで取得する銘柄数
+MAX_RETRY = 2     # 取得失敗した銘柄だけを再試行する回数
 
 # --- 条件セット（段階的に緩める） ---
 CONDITIONS = [
@@ -30,85 +34,100 @@ CONDITIONS = [
 
 # --- ステップ①：銘柄リスト取得（東証プライム） ---
 def load_prime_symbols_from_xls(xls_path):
-    df = pd.read_excel(xls_path, header=0)
-    df.columns = df.columns.str.strip().str.lower()
-    if "market" not in df.columns or "code" not in df.columns or "symbol" not in df.columns:
-        raise ValueError(f"必要な列（market, code, symbol）が見つかりません。列名一覧: {df.columns.tolist()}")
-    df = df[df["market"].str.contains("プライム", na=False)]
-    df["code"] = df["code"].astype(str).str.zfill(4) + ".T"
-    return df[["code", "symbol"]].drop_duplicates()
-
-# --- ステップ②：初動検知 ---
-def detect_initial_move_row(row, vol_threshold, pr_threshold):
-    symbol, name = row.code, row.symbol
-    try:
-        df = yf.download(symbol, period=FETCH_PERIOD, interval="1d", progress=False, auto_adjust=False)
-        if df.empty or len(df) < 6:
-            return None
-
-        df["volume_change"] = df["Volume"] / df["Volume"].rolling(5).mean()
-        df["price_range"] = (df["Close"] - df["Open"]).abs() / df["Open"]
-        df["avg_volume"] = df["Volume"].rolling(5).mean()
-
-        latest = df.iloc[[-1]]
-        if (
-            latest["volume_change"].iloc[0] > vol_threshold and
-            latest["price_range"].iloc[0] < pr_threshold and
-            latest["avg_volume"].iloc[0] > MIN_VOLUME
-        ):
-            return {
-                "symbol": symbol,
-                "name": name,
-                "date": latest.index[0].strftime("%Y-%m-%d"),
-                "open": round(latest["Open"].iloc[0], 2),
-                "high": round(latest["High"].iloc[0], 2),
-                "low": round(latest["Low"].iloc[0], 2),
-                "close": round(latest["Close"].iloc[0], 2),
-                "volume_change": round(latest["volume_change"].iloc[0], 2),
-                "price_range": round(latest["price_range"].iloc[0], 4),
-                "avg_volume": int(latest["avg_volume"].iloc[0]),
-            }
-    except Exception:
+    master = filter_market(load_symbol_master(xls_path), "プライム")
+    return master[["symbol", "name"]].rename(columns={"symbol": "code", "name": "symbol"})
+
+# --- ステップ②：初動指標の取得（まとめてダウンロード→銘柄ごとに指標計算） ---
+def compute_initial_move_metrics(symbol, name, df):
+    if df.empty or len(df) < 6:
         return None
-    return None
 
-# --- ステップ③：全銘柄ループ処理 ---
-def main():
+    df = df.copy()
+    df["volume_change"] = df["Volume"] / df["Volume"].rolling(5).mean()
+    df["price_range"] = (df["Close"] - df["Open"]).abs() / df["Open"]
+    df["avg_volume"] = df["Volume"].rolling(5).mean()
+
+    latest = df.iloc[-1]
+    return {
+        "symbol": symbol,
+        "name": name,
+        "date": df.index[-1].strftime("%Y-%m-%d"),
+        "open": round(latest["Open"], 2),
+        "high": round(latest["High"], 2),
+        "low": round(latest["Low"], 2),
+        "close": round(latest["Close"], 2),
+        "volume_change": latest["volume_change"],
+        "price_range": latest["price_range"],
+        "avg_volume": latest["avg_volume"],
+    }
+
+def build_metrics_table(symbols_df, provider, batch_size=BATCH_SIZE, tracer=NULL_TRACER):
+    """
+    全銘柄の最新足の指標（volume_change / price_range / avg_volume）を1つの表にまとめる。
+    """
+    names = dict(zip(symbols_df["code"], symbols_df["symbol"]))
+    frames, failed = fetch_in_batches(provider, list(names), batch_size=batch_size, max_retry=MAX_RETRY,
+                                      tracer=tracer)
+    if failed:
+        print(f"⚠️ 取得できなかった銘柄: {len(failed)}件")
+
+    rows = []
+    for symbol, df in frames.items():
+        try:
+            with tracer.span("metrics", symbol=symbol):
+                result = compute_initial_move_metrics(symbol, names[symbol], df)
+        except Exception:
+            result = None
+        if result:
+            rows.append(result)
+    return pd.DataFrame(rows)
+
+# --- ステップ③：条件セットの判定（メモリ上で段階的に緩める） ---
+def detect_initial_moves(metrics_df, vol_threshold, pr_threshold):
+    if metrics_df.empty:
+        return metrics_df
+    hits = metrics_df[
+        (metrics_df["volume_change"] > vol_threshold) &
+        (metrics_df["price_range"] < pr_threshold) &
+        (metrics_df["avg_volume"] > MIN_VOLUME)
+    ].copy()
+    hits["volume_change"] = hits["volume_change"].round(2)
+    hits["price_range"] = hits["price_range"].round(4)
+    hits["avg_volume"] = hits["avg_volume"].astype(int)
+    return hits
+
+# --- ステップ④：全銘柄ループ処理 ---
+def main(provider=None, batch_size=BATCH_SIZE, tracer=NULL_TRACER):
+    provider = provider or YFinanceProvider(period=FETCH_PERIOD)
     start = time.time()
-    symbols_df = load_prime_symbols_from_xls(DATA_XLS_PATH)
+    with tracer.span("load_symbols"):
+        symbols_df = load_prime_symbols_from_xls(DATA_XLS_PATH)
     total = len(symbols_df)
     print(f"📥 全銘柄数: {total}件")
 
+    metrics_df = build_metrics_table(symbols_df, provider, batch_size=batch_size, tracer=tracer)
+    print(f"📊 指標取得: {len(metrics_df)}件")
+
     for idx, condition in enumerate(CONDITIONS, 1):
         vol_th = condition["volume_change"]
         pr_th = condition["price_range"]
 
         print(f"\n🔍 条件セット {idx}: volume_change > {vol_th}, price_range < {pr_th}")
 
-        results = []
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = [executor.submit(detect_initial_move_row, row, vol_th, pr_th)
-                       for row in symbols_df.itertuples()]
-            for i, future in enumerate(as_completed(futures), 1):
-                if i % 100 == 0:
-                    print(f"🚀 {i}件処理中...")
-                result = future.result()
-                if result:
-                    results.append(result)
-
-        if results:
-            condition_info = f"volume_change > {vol_th}, price_range < {pr_th}, MIN_VOLUME > {MIN_VOLUME}"
+        with tracer.span("detect", condition=idx):
+            results_df = detect_initial_moves(metrics_df, vol_th, pr_th)
+
+        if not results_df.empty:
             output_path = output_dir / f"initial_move_candidates_v{idx}_{today_str}.csv"
 
             # 条件行付きでCSV出力
             with open(output_path, "w", newline="", encoding="utf-8") as f:
                 writer = csv.writer(f)
                 writer.writerow([f"# 条件: volume_change > {vol_th}, price_range < {pr_th}, MIN_VOLUME > {MIN_VOLUME}"])
-                results_df = pd.DataFrame(results)
                 writer.writerow(results_df.columns)
                 writer.writerows(results_df.values)
 
-            print(f"\n✅ 条件セット {idx} にて {len(results)}件検出 → {output_path}")
+            print(f"\n✅ 条件セット {idx} にて {len(results_df)}件検出 → {output_path}")
             break
         else:
             print(f"⛔ 条件セット {idx} は該当なし（volume>{vol_th}, price<{pr_th}）")
@@ -117,4 +136,16 @@ def main():
     print(f"\n⏱️ 所要時間: {elapsed:.2f}秒（約{elapsed/60:.1f}分）")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="東証プライム 初動銘柄スクリーニング")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="一括ダウンロードの銘柄数")
+    parser.add_argument("--fake", action="store_true", help="ネットワークを使わず FakeProvider で実行（ベンチマーク用）")
+    parser.add_argument("--trace", nargs="?", const=str(output_dir / f"trace_{today_str}.json"), metavar="JSON_PATH",
+                        help="処理区間を Chrome trace 形式で書き出す（chrome://tracing / Perfetto で表示）")
+    args = parser.parse_args()
+
+    provider = FakeProvider(days=10) if args.fake else YFinanceProvider(period=FETCH_PERIOD)
+    tracer = TraceRecorder("初動") if args.trace else NULL_TRACER
+    main(provider=provider, batch_size=args.batch_size, tracer=tracer)
+    if args.trace:
+        count = tracer.write(args.trace)
+        print(f"🧭 トレース出力: {args.trace}（{count}区間）")
@@ -0,0 +1,125 @@
+# ==============================
+# Sec｜price_provider.py｜株価取得プロバイダ（まとめてダウンロード＋失敗分のみ再試行）
+# ==============================
+
+import time
+import zlib
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from trace_events import NULL_TRACER
+
+OHLCV_COLS = ["Open", "High", "Low", "Close", "Volume"]
+
+class PriceProvider:
+    """
+    プロバイダの共通インターフェース。
+    download(symbols) は {symbol: OHLCV DataFrame} を返し、取得できなかった銘柄はキーに含めない。
+    """
+    def download(self, symbols):
+        raise NotImplementedError
+
+class YFinanceProvider(PriceProvider):
+    def __init__(self, period="10d", interval="1d"):
+        self.period = period
+        self.interval = interval
+
+    def download(self, symbols):
+        df = yf.download(
+            symbols, period=self.period, interval=self.interval,
+            group_by="ticker", auto_adjust=False, threads=True, progress=False
+        )
+        if df is None or df.empty:
+            return {}
+
+        frames = {}
+        if not isinstance(df.columns, pd.MultiIndex):
+            # 1銘柄だけのときは列が1段になることがある
+            if len(symbols) == 1:
+                frames[symbols[0]] = df
+        else:
+            available = set(df.columns.get_level_values(0))
+            for symbol in symbols:
+                if symbol in available:
+                    frames[symbol] = df[symbol]
+
+        result = {}
+        for symbol, frame in frames.items():
+            frame = frame.dropna(subset=[c for c in OHLCV_COLS if c in frame.columns], how="all")
+            if not frame.empty:
+                result[symbol] = frame
+        return result
+
+class FakeProvider(PriceProvider):
+    """
+    ネットワークを使わないテスト・ベンチマーク用プロバイダ。
+    銘柄コードから決まる乱数で日足を生成し、fail_rate の割合で取得失敗を再現する。
+    """
+    def __init__(self, days=10, latency=0.0, fail_rate=0.0, seed=0):
+        self.days = days
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.seed = seed
+        self.calls = 0
+        self._attempts = {}
+
+    def download(self, symbols):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        end = pd.Timestamp.today().normalize()
+        index = pd.bdate_range(end=end, periods=self.days, name="Date")
+        result = {}
+        for symbol in symbols:
+            attempt = self._attempts.get(symbol, 0)
+            self._attempts[symbol] = attempt + 1
+            rng = np.random.default_rng(zlib.crc32(symbol.encode()) + self.seed)
+            # 初回のみ失敗させ、再試行では成功させる（失敗分のみ再取得の確認用）
+            if attempt == 0 and rng.random() < self.fail_rate:
+                continue
+
+            close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, self.days)))
+            open_ = close * (1 + rng.normal(0, 0.01, self.days))
+            result[symbol] = pd.DataFrame({
+                "Open": open_,
+                "High": np.maximum(open_, close) * 1.01,
+                "Low": np.minimum(open_, close) * 0.99,
+                "Close": close,
+                "Adj Close": close,
+                "Volume": rng.integers(10_000, 2_000_000, self.days),
+            }, index=index)
+        return result
+
+def fetch_in_batches(provider, symbols, batch_size=100, max_retry=2, retry_wait=2, tracer=NULL_TRACER):
+    """
+    symbols を batch_size ごとにまとめて取得し、取得できなかった銘柄だけを再試行する。
+    戻り値：({symbol: DataFrame}, 最終的に失敗した銘柄のリスト)
+    """
+    symbols = list(symbols)
+    frames = {}
+    pending = symbols
+    for attempt in range(max_retry + 1):
+        failed = []
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            try:
+                with tracer.span("download", symbols=len(batch), first=batch[0], attempt=attempt):
+                    got = provider.download(batch)
+            except Exception as e:
+                print(f"⚠️ 一括取得エラー（{len(batch)}銘柄）: {e}")
+                got = {}
+            frames.update(got)
+            failed += [s for s in batch if s not in got]
+            print(f"🚀 {min(start + batch_size, len(pending))}/{len(pending)}件取得...")
+
+        if not failed:
+            break
+        if attempt < max_retry:
+            print(f"🔁 取得失敗 {len(failed)}件を再試行（{attempt + 1}/{max_retry}）")
+            if retry_wait:
+                time.sleep(retry_wait)
+        pending = failed
+
+    return frames, failed
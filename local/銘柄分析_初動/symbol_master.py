@@ -0,0 +1,94 @@
+# ==============================
+# Sec｜symbol_master.py｜銘柄マスタ（data_j.xls → バイナリキャッシュ）
+# ==============================
+
+import os
+import pickle
+import threading
+import pandas as pd
+from pathlib import Path
+
+DATA_XLS_PATH = Path(__file__).resolve().parent / "data_j.xls"
+MASTER_COLS = ["symbol", "code", "name", "market", "sector"]
+
+# プロセス内キャッシュ（xlsパス → (mtime, DataFrame, 銘柄名辞書)）
+_loaded = {}
+_load_lock = threading.Lock()  # 複数スレッドから同時に呼ばれても読み込み・保存は1回
+
+def _cache_path(xls_path):
+    return xls_path.with_suffix(".master.pkl")
+
+def _build_master(xls_path):
+    """
+    data_j.xls（JPX上場銘柄一覧）を読み込み、code / name / market / sector の表にする。
+    """
+    df = pd.read_excel(xls_path, header=0)
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    if "market" not in df.columns or "code" not in df.columns or "symbol" not in df.columns:
+        raise ValueError(f"必要な列（market, code, symbol）が見つかりません。列名一覧: {df.columns.tolist()}")
+
+    master = pd.DataFrame({
+        "code": df["code"].astype(str).str.strip().str.zfill(4),
+        "name": df["symbol"].astype(str).str.normalize("NFKC").str.strip(),  # 全角英数を半角に
+        "market": df["market"].astype(str).str.strip(),
+        "sector": df["33業種区分"].astype(str).str.strip() if "33業種区分" in df.columns else "",
+    })
+    master["symbol"] = master["code"] + ".T"
+    return master[MASTER_COLS].drop_duplicates(subset=["symbol"]).reset_index(drop=True)
+
+def load_symbol_master(xls_path=DATA_XLS_PATH):
+    """
+    銘柄マスタを返す。xlsの更新日時が変わっていなければキャッシュ（pickle）から読み込む。
+    """
+    xls_path = Path(xls_path)
+    mtime = xls_path.stat().st_mtime
+
+    with _load_lock:
+        cached = _loaded.get(xls_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        cache_path = _cache_path(xls_path)
+        master = None
+        if cache_path.exists():
+            try:
+                with open(cache_path, "rb") as f:
+                    payload = pickle.load(f)
+                if payload.get("mtime") == mtime:
+                    master = payload["master"]
+            except Exception as e:
+                print(f"⚠️ 銘柄マスタキャッシュ読み込み失敗: {e} → 再作成")
+
+        if master is None:
+            master = _build_master(xls_path)
+            try:
+                # ✅ 一時ファイルに書いてから置き換える（書きかけのキャッシュを他のプロセスに読ませない）
+                tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+                with open(tmp_path, "wb") as f:
+                    pickle.dump({"mtime": mtime, "master": master}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except OSError as e:
+                print(f"⚠️ 銘柄マスタキャッシュ保存失敗: {e}")
+
+        _loaded[xls_path] = (mtime, master, dict(zip(master["symbol"], master["name"])))
+        return master
+
+def filter_market(master, keyword):
+    """
+    市場区分（例：「プライム」）を含む銘柄だけに絞り込む。
+    """
+    return master[master["market"].str.contains(keyword, na=False)]
+
+def get_name_map(xls_path=DATA_XLS_PATH):
+    """
+    {"7203.T": "トヨタ自動車", ...} 形式の銘柄名辞書を返す。
+    """
+    load_symbol_master(xls_path)
+    return _loaded[Path(xls_path)][2]
+
+def resolve_name(symbol, default=None, xls_path=DATA_XLS_PATH):
+    try:
+        return get_name_map(xls_path).get(symbol, default)
+    except Exception as e:
+        print(f"⚠️ 銘柄マスタ参照失敗: {e}")
+        return default
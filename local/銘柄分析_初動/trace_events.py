@@ -0,0 +1,91 @@
+# ==============================
+# Sec｜trace_events.py｜処理区間の記録（Chrome trace-event 形式・個別／初動で共用）
+# ==============================
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+def now_us():
+    """
+    記録用の時刻（マイクロ秒）。単調時計なので別プロセスの記録とも並べられる。
+    """
+    return time.perf_counter_ns() / 1000
+
+class TraceRecorder:
+    """
+    銘柄・段ごとの処理区間を記録し、chrome://tracing / Perfetto で開ける JSON に書き出す。
+    区間は開始時刻＋長さの1イベント（ph="X"）で、プロセスID・スレッドIDを付ける。
+    """
+    enabled = True
+
+    def __init__(self, process_name="main"):
+        self.events = []
+        self._names = {}  # (pid, tid) → スレッド名
+        self._lock = threading.Lock()
+        self.process_names = {os.getpid(): process_name}
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        start = now_us()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, now_us(), cat=cat, **args)
+
+    def add_span(self, name, start, end, cat="stage", pid=None, tid=None, thread_name=None, **args):
+        """
+        開始・終了時刻（now_us）を指定して1区間を追加する（別プロセスで測った区間の取り込み用）。
+        """
+        if pid is None:
+            pid = os.getpid()
+        if tid is None:
+            tid = threading.get_native_id()
+            thread_name = threading.current_thread().name
+        event = {"name": name, "cat": cat, "ph": "X", "ts": start, "dur": end - start,
+                 "pid": pid, "tid": tid, "args": args}
+        with self._lock:
+            self.events.append(event)
+            if thread_name and (pid, tid) not in self._names:
+                self._names[(pid, tid)] = thread_name
+
+    def name_process(self, pid, name):
+        """
+        別プロセス（描画ワーカー等）の表示名を付ける。最初に付けた名前を残す。
+        """
+        with self._lock:
+            self.process_names.setdefault(pid, name)
+
+    def write(self, path):
+        # 記録中のスレッドがあっても崩れないよう、名前・イベントはロックの中で写し取る
+        with self._lock:
+            process_names = list(self.process_names.items())
+            thread_names = list(self._names.items())
+            events = sorted(self.events, key=lambda e: e["ts"])
+        meta = [{"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": name}}
+                for pid, name in process_names]
+        meta += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for (pid, tid), name in thread_names]
+        events = meta + events
+        os.makedirs(Path(path).parent, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+        return len(self.events)
+
+class NullTracer:
+    """
+    記録しないとき用。span は使い回しの空コンテキストを返すだけ（ほぼコストなし）。
+    """
+    enabled = False
+    _empty = nullcontext()
+
+    def span(self, name, cat="stage", **args):
+        return self._empty
+
+    def add_span(self, *args, **kwargs):
+        pass
+
+NULL_TRACER = NullTracer()